@@ -112,11 +112,8 @@ async def update_fact(project_id: str, fact_id: str, fact: Fact):
         raise HTTPException(404, "事实不存在")
     # 重写文件
     storage = get_storage()
-    path = storage._get_project_dir(project_id) / "canon" / "facts.jsonl"
-    if path.exists():
-        path.unlink()
-    for f in new_facts:
-        await storage.append_jsonl(path, f.model_dump())
+    path = storage._get_project_dir(project_id, "canon") / "facts.jsonl"
+    await storage.write_jsonl(path, [f.model_dump() for f in new_facts])
     return fact
 
 
@@ -129,11 +126,8 @@ async def delete_fact(project_id: str, fact_id: str):
         raise HTTPException(404, "事实不存在")
     # 重写文件
     storage = get_storage()
-    path = storage._get_project_dir(project_id) / "canon" / "facts.jsonl"
-    if path.exists():
-        path.unlink()
-    for f in new_facts:
-        await storage.append_jsonl(path, f.model_dump())
+    path = storage._get_project_dir(project_id, "canon") / "facts.jsonl"
+    await storage.write_jsonl(path, [f.model_dump() for f in new_facts])
     return {"success": True}
 
 
@@ -154,11 +148,8 @@ async def batch_delete_facts(project_id: str, req: BatchDeleteFactsRequest):
 
     # 重写文件
     storage = get_storage()
-    path = storage._get_project_dir(project_id) / "canon" / "facts.jsonl"
-    if path.exists():
-        path.unlink()
-    for f in new_facts:
-        await storage.append_jsonl(path, f.model_dump())
+    path = storage._get_project_dir(project_id, "canon") / "facts.jsonl"
+    await storage.write_jsonl(path, [f.model_dump() for f in new_facts])
 
     return BatchDeleteResponse(
         success=True,
@@ -198,11 +189,8 @@ async def update_timeline_event(project_id: str, event_id: str, event: TimelineE
         raise HTTPException(404, "事件不存在")
     # 重写文件
     storage = get_storage()
-    path = storage._get_project_dir(project_id) / "canon" / "timeline.jsonl"
-    if path.exists():
-        path.unlink()
-    for e in new_events:
-        await storage.append_jsonl(path, e.model_dump())
+    path = storage._get_project_dir(project_id, "canon") / "timeline.jsonl"
+    await storage.write_jsonl(path, [e.model_dump() for e in new_events])
     return event
 
 
@@ -215,11 +203,8 @@ async def delete_timeline_event(project_id: str, event_id: str):
         raise HTTPException(404, "事件不存在")
     # 重写文件
     storage = get_storage()
-    path = storage._get_project_dir(project_id) / "canon" / "timeline.jsonl"
-    if path.exists():
-        path.unlink()
-    for e in new_events:
-        await storage.append_jsonl(path, e.model_dump())
+    path = storage._get_project_dir(project_id, "canon") / "timeline.jsonl"
+    await storage.write_jsonl(path, [e.model_dump() for e in new_events])
     return {"success": True}
 
 
@@ -240,11 +225,8 @@ async def batch_delete_timeline(project_id: str, req: BatchDeleteTimelineRequest
 
     # 重写文件
     storage = get_storage()
-    path = storage._get_project_dir(project_id) / "canon" / "timeline.jsonl"
-    if path.exists():
-        path.unlink()
-    for e in new_events:
-        await storage.append_jsonl(path, e.model_dump())
+    path = storage._get_project_dir(project_id, "canon") / "timeline.jsonl"
+    await storage.write_jsonl(path, [e.model_dump() for e in new_events])
 
     return BatchDeleteResponse(
         success=True,
@@ -294,11 +276,8 @@ async def edit_character_state(project_id: str, character: str, chapter: str, st
         raise HTTPException(404, "角色状态不存在")
     # 重写文件
     storage = get_storage()
-    path = storage._get_project_dir(project_id) / "canon" / "states.jsonl"
-    if path.exists():
-        path.unlink()
-    for s in new_states:
-        await storage.append_jsonl(path, s.model_dump())
+    path = storage._get_project_dir(project_id, "canon") / "states.jsonl"
+    await storage.write_jsonl(path, [s.model_dump() for s in new_states])
     return state
 
 
@@ -311,11 +290,8 @@ async def delete_character_state(project_id: str, character: str, chapter: str):
         raise HTTPException(404, "角色状态不存在")
     # 重写文件
     storage = get_storage()
-    path = storage._get_project_dir(project_id) / "canon" / "states.jsonl"
-    if path.exists():
-        path.unlink()
-    for s in new_states:
-        await storage.append_jsonl(path, s.model_dump())
+    path = storage._get_project_dir(project_id, "canon") / "states.jsonl"
+    await storage.write_jsonl(path, [s.model_dump() for s in new_states])
     return {"success": True}
 
 
@@ -342,11 +318,8 @@ async def batch_delete_states(project_id: str, req: BatchDeleteStatesRequest):
 
     # 重写文件
     storage = get_storage()
-    path = storage._get_project_dir(project_id) / "canon" / "states.jsonl"
-    if path.exists():
-        path.unlink()
-    for s in new_states:
-        await storage.append_jsonl(path, s.model_dump())
+    path = storage._get_project_dir(project_id, "canon") / "states.jsonl"
+    await storage.write_jsonl(path, [s.model_dump() for s in new_states])
 
     return BatchDeleteResponse(
         success=True,
@@ -400,15 +373,10 @@ async def extract_facts_from_chapter(project_id: str, req: ExtractRequest):
         new_timeline = result.get("timeline", [])
         new_states = result.get("states", [])
 
-        # 添加新提取的数据
-        for fact in new_facts:
-            await storage.add_fact(project_id, fact)
-
-        for event in new_timeline:
-            await storage.add_timeline_event(project_id, event)
-
-        for state in new_states:
-            await storage.update_character_state(project_id, state)
+        # 添加新提取的数据（每类整批写入一次）
+        await storage.add_facts(project_id, new_facts)
+        await storage.add_timeline_events(project_id, new_timeline)
+        await storage.update_character_states(project_id, new_states)
 
         # 直接使用提取的数量作为结果
         message = f"成功提取 {len(new_facts)} 条事实、{len(new_timeline)} 条时间线、{len(new_states)} 条角色状态"
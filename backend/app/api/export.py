@@ -5,7 +5,7 @@
 from urllib.parse import quote
 
 from fastapi import APIRouter, HTTPException
-from fastapi.responses import Response
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import Optional
 
@@ -73,14 +73,15 @@ async def export_project(project_id: str, req: ExportRequest):
         )
 
     try:
-        result = await exporter.export(project_id, format_enum, req.use_final)
+        # 按块流式返回，不在内存中保留整个文件的多份副本
+        result = await exporter.export_stream(project_id, format_enum, req.use_final)
 
         # 设置文件名（处理中文 - 使用 URL 编码）
         filename = result.filename
         encoded_filename = quote(filename)
 
-        return Response(
-            content=result.content,
+        return StreamingResponse(
+            result.chunks,
             media_type=result.content_type,
             headers={
                 "Content-Disposition": f"attachment; filename*=UTF-8''{encoded_filename}",
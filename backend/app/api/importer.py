@@ -2,6 +2,8 @@
 小说导入 API
 """
 
+import io
+import mmap
 from typing import Optional
 from fastapi import APIRouter, HTTPException, UploadFile, File, Form
 from pydantic import BaseModel
@@ -14,11 +16,35 @@ from app.models.card import WorldCard, CharacterCard, StyleCard
 
 router = APIRouter()
 
+# 超过该大小的上传文件直接映射其磁盘临时文件，不再整体读入内存
+MMAP_MIN_BYTES = 8 * 1024 * 1024
+
 _project_storage = None
 _draft_storage = None
 _card_storage = None
 
 
+async def _read_upload(file: UploadFile):
+    """
+    读取上传文件内容
+
+    大文件已被 Starlette 落盘到临时文件，直接只读 mmap，由内核按需换页；
+    小文件或无法映射时读入 bytes。调用方用完后需对 mmap 调用 close()
+    """
+    if file.size and file.size >= MMAP_MIN_BYTES:
+        try:
+            return mmap.mmap(file.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError, io.UnsupportedOperation):
+            pass
+    return await file.read()
+
+
+def _release_upload(content) -> None:
+    """释放 _read_upload 返回的映射"""
+    if isinstance(content, mmap.mmap):
+        content.close()
+
+
 def get_project_storage() -> ProjectStorage:
     global _project_storage
     if _project_storage is None:
@@ -73,16 +99,19 @@ async def preview_import(
     用于让用户确认章节分解是否正确
     """
     try:
-        content = await file.read()
+        content = await _read_upload(file)
         filename = file.filename or "unknown.txt"
 
         import_service = get_import_service()
         # 只解析，不进行 AI 分析
-        result = await import_service.import_novel(
-            filename=filename,
-            content=content,
-            analyze=False
-        )
+        try:
+            result = await import_service.import_novel(
+                filename=filename,
+                content=content,
+                analyze=False
+            )
+        finally:
+            _release_upload(content)
 
         return ParsePreviewResponse(
             success=True,
@@ -125,17 +154,20 @@ async def import_novel(
         analyze: 是否进行 AI 分析（默认 True）
     """
     try:
-        content = await file.read()
+        content = await _read_upload(file)
         filename = file.filename or "unknown.txt"
 
         # 1. 解析小说
         import_service = get_import_service()
-        result = await import_service.import_novel(
-            filename=filename,
-            content=content,
-            project_name=project_name,
-            analyze=analyze
-        )
+        try:
+            result = await import_service.import_novel(
+                filename=filename,
+                content=content,
+                project_name=project_name,
+                analyze=analyze
+            )
+        finally:
+            _release_upload(content)
 
         novel_info = result["novel"]
         chapters = result["chapters"]
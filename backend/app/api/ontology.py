@@ -112,10 +112,10 @@ async def list_characters(project_id: str):
 async def get_character(project_id: str, name: str):
     """获取单个角色详情"""
     ontology = await storage.get_ontology(project_id)
-    if name not in ontology.characters.nodes:
+    node = ontology.characters.get_node(name)
+    if node is None:
         raise HTTPException(status_code=404, detail="角色不存在")
 
-    node = ontology.characters.nodes[name]
     return CharacterNodeResponse(
         name=node.name,
         status=node.status.value,
@@ -4,10 +4,11 @@ Token 预算管理器
 """
 
 import logging
-import re
 from typing import Dict, Any, List, Optional
 from dataclasses import dataclass
 
+from app.utils.helpers import count_chinese_chars
+
 logger = logging.getLogger(__name__)
 
 
@@ -38,7 +39,7 @@ class TokenBudgeter:
             return 0
 
         # 分离中文和英文
-        chinese_chars = len(re.findall(r'[\u4e00-\u9fff]', text))
+        chinese_chars = count_chinese_chars(text)
         other_chars = len(text) - chinese_chars
 
         # 估算 token 数
@@ -275,20 +275,20 @@ class Orchestrator:
             saved_counts = {"facts": 0, "timeline": 0, "states": 0}
 
             if facts_result.get("success"):
-                # 保存事实
-                for fact in facts_result.get("facts", []):
-                    await self.canon.add_fact(project_id, fact)
-                    saved_counts["facts"] += 1
+                # 保存事实（每类整批写入一次）
+                facts = facts_result.get("facts", [])
+                await self.canon.add_facts(project_id, facts)
+                saved_counts["facts"] = len(facts)
 
                 # 保存时间线事件
-                for event in facts_result.get("timeline", []):
-                    await self.canon.add_timeline_event(project_id, event)
-                    saved_counts["timeline"] += 1
+                events = facts_result.get("timeline", [])
+                await self.canon.add_timeline_events(project_id, events)
+                saved_counts["timeline"] = len(events)
 
                 # 保存角色状态
-                for state in facts_result.get("states", []):
-                    await self.canon.update_character_state(project_id, state)
-                    saved_counts["states"] += 1
+                states = facts_result.get("states", [])
+                await self.canon.update_character_states(project_id, states)
+                saved_counts["states"] = len(states)
 
                 logger.info(
                     f"自动提取并保存: {saved_counts['facts']} 个事实, "
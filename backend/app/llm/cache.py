@@ -0,0 +1,106 @@
+"""
+LLM 响应缓存
+内存 LRU 作为前置层，文件作为持久层，服务重启后仍可命中
+"""
+
+import hashlib
+import json
+import logging
+import os
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import aiofiles
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = Path.home() / ".cache" / "cursor-writing" / "llm"
+
+
+class FileBackend:
+    """文件缓存后端：每个条目一个 JSON 文件，文件名为键的 sha256"""
+
+    def __init__(self, cache_dir: Optional[Path] = None):
+        self.cache_dir = Path(cache_dir or DEFAULT_CACHE_DIR)
+
+    def _path(self, key: str) -> Path:
+        # 按前两位分桶，避免单目录文件过多
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        path = self._path(key)
+        try:
+            async with aiofiles.open(path, 'r', encoding='utf-8') as f:
+                return json.loads(await f.read())
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"读取 LLM 缓存失败: {path}, {e}")
+            return None
+
+    async def set(self, key: str, value: Dict[str, Any]) -> None:
+        path = self._path(key)
+        tmp_path = path.with_suffix(".tmp")
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            async with aiofiles.open(tmp_path, 'w', encoding='utf-8') as f:
+                await f.write(json.dumps(value, ensure_ascii=False))
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning(f"写入 LLM 缓存失败: {path}, {e}")
+
+
+class ResponseCache:
+    """两级响应缓存：内存 LRU → 文件"""
+
+    def __init__(self, maxsize: int = 1024, backend: Optional[FileBackend] = None):
+        self.maxsize = maxsize
+        self.backend = backend or FileBackend()
+        self._memory: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+    @staticmethod
+    def make_key(
+        provider: str,
+        model: str,
+        messages: List[Dict[str, str]],
+        temperature: Optional[float],
+        max_tokens: Optional[int]
+    ) -> str:
+        """根据请求参数生成缓存键"""
+        payload = json.dumps(
+            {
+                "provider": provider,
+                "model": model,
+                "messages": messages,
+                "temperature": temperature,
+                "max_tokens": max_tokens,
+            },
+            ensure_ascii=False,
+            sort_keys=True
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """获取缓存（先查内存，再查文件）"""
+        value = self._memory.get(key)
+        if value is not None:
+            self._memory.move_to_end(key)
+            return dict(value)
+
+        value = await self.backend.get(key)
+        if value is not None:
+            self._remember(key, value)
+            return dict(value)
+        return None
+
+    async def set(self, key: str, value: Dict[str, Any]) -> None:
+        """写入缓存（内存和文件）"""
+        self._remember(key, value)
+        await self.backend.set(key, value)
+
+    def _remember(self, key: str, value: Dict[str, Any]) -> None:
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        if len(self._memory) > self.maxsize:
+            self._memory.popitem(last=False)
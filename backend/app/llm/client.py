@@ -5,9 +5,11 @@ LLM 客户端
 
 import asyncio
 import logging
+import threading
 from typing import List, Dict, Any, Optional
 
 from app.config import get_config
+from app.llm.cache import ResponseCache, FileBackend
 from app.llm.providers import (
     BaseProvider,
     OpenAIProvider,
@@ -23,14 +25,24 @@ logger = logging.getLogger(__name__)
 class LLMClient:
     """LLM 客户端"""
 
+    # API Key 占位符前缀（str.startswith 支持元组，一次调用完成匹配）
+    _PLACEHOLDERS = ("sk-your-", "your-", "xxx", "placeholder")
+
     def __init__(self):
         self.providers: Dict[str, BaseProvider] = {}
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
         self.config = get_config()
         self._init_providers()
+        self._init_agent_settings()
+
+        # 响应缓存（仅用于确定性请求：temperature 为 0 或显式 cache=True）
+        cache_dir = self.config.get("llm.cache_dir")
+        self.response_cache = ResponseCache(backend=FileBackend(cache_dir))
 
-        # 统计
+        # 统计：total_requests / total_tokens 只计实际发给提供商的请求，缓存命中单独计数
         self.total_requests = 0
         self.total_tokens = 0
+        self.cache_hits = 0
 
     def _init_providers(self):
         """初始化已配置的提供商"""
@@ -84,8 +96,29 @@ class LLMClient:
                     temperature=cfg.get("temperature", 0.7)
                 )
 
+        # 每个提供商的并发上限，避免大量并发请求触发 429 后集体重试
+        for name in self.providers:
+            max_concurrent = llm_config.get(name, {}).get("max_concurrent", 32)
+            self._semaphores[name] = asyncio.Semaphore(max_concurrent)
+
         logger.info(f"已初始化 LLM 提供商: {list(self.providers.keys())}")
 
+    def _init_agent_settings(self):
+        """预先解析各 Agent 的提供商和温度配置，避免每次请求遍历配置"""
+        self._agent_provider: Dict[str, str] = {}
+        self._agent_temperature: Dict[str, float] = {}
+
+        fallback = next(iter(self.providers), None)
+        for agent_name, agent_cfg in (self.config.get("agents", {}) or {}).items():
+            if not isinstance(agent_cfg, dict):
+                continue
+            provider = agent_cfg.get("provider", self.default_provider)
+            # 如果配置的提供商不可用，回退
+            if provider not in self.providers and fallback:
+                provider = fallback
+            self._agent_provider[agent_name] = provider
+            self._agent_temperature[agent_name] = agent_cfg.get("temperature", 0.7)
+
     def _has_valid_key(self, key: Optional[str]) -> bool:
         """检查 API Key 是否有效（非占位符）"""
         if not key:
@@ -93,8 +126,7 @@ class LLMClient:
         # 过滤未解析的环境变量占位符 ${...}
         if key.startswith("${") and key.endswith("}"):
             return False
-        placeholders = ["sk-your-", "your-", "xxx", "placeholder"]
-        return not any(key.lower().startswith(p) for p in placeholders)
+        return not key.lower().startswith(self._PLACEHOLDERS)
 
     @property
     def default_provider(self) -> str:
@@ -112,7 +144,8 @@ class LLMClient:
         provider: Optional[str] = None,
         temperature: Optional[float] = None,
         max_tokens: Optional[int] = None,
-        retry: int = 3
+        retry: int = 3,
+        cache: Optional[bool] = None
     ) -> Dict[str, Any]:
         """
         发送聊天请求
@@ -123,6 +156,7 @@ class LLMClient:
             temperature: 温度参数
             max_tokens: 最大 token 数
             retry: 重试次数
+            cache: 是否使用响应缓存，None 则仅在温度为 0 时启用
 
         Returns:
             {"content": "...", "usage": {...}, "provider": "..."}
@@ -138,18 +172,40 @@ class LLMClient:
             logger.warning(f"提供商 {provider} 不可用，回退到 {provider_name}")
 
         llm = self.providers[provider_name]
+        # 显式传入的 0 也是有效温度，只有 None 才用提供商默认值
+        if temperature is None:
+            temperature = llm.temperature
+
+        # 确定性请求走缓存
+        if cache is None:
+            cache = temperature == 0
+        cache_key = None
+        if cache:
+            cache_key = ResponseCache.make_key(
+                provider_name, llm.model, messages,
+                temperature, max_tokens or llm.max_tokens
+            )
+            cached = await self.response_cache.get(cache_key)
+            if cached is not None:
+                logger.debug(f"LLM 缓存命中: {cache_key[:12]}")
+                self.cache_hits += 1
+                return cached
 
         # 带重试的请求
         last_error = None
         for attempt in range(retry):
             try:
-                result = await llm.chat(messages, temperature, max_tokens)
+                async with self._semaphores[provider_name]:
+                    result = await llm.chat(messages, temperature, max_tokens)
                 result["provider"] = provider_name
 
                 # 更新统计
                 self.total_requests += 1
                 self.total_tokens += result.get("usage", {}).get("total_tokens", 0)
 
+                if cache_key:
+                    await self.response_cache.set(cache_key, result)
+
                 return result
 
             except Exception as e:
@@ -162,41 +218,49 @@ class LLMClient:
 
     def get_provider_for_agent(self, agent_name: str) -> str:
         """获取 Agent 配置的提供商"""
-        agent_cfg = self.config.get(f"agents.{agent_name}", {})
-        provider = agent_cfg.get("provider", self.default_provider)
+        provider = self._agent_provider.get(agent_name)
+        if provider is not None:
+            return provider
 
-        # 如果配置的提供商不可用，回退
+        # 未单独配置的 Agent 使用默认提供商，不可用时回退
+        provider = self.default_provider
         if provider not in self.providers and self.providers:
-            return list(self.providers.keys())[0]
+            return next(iter(self.providers))
         return provider
 
     def get_temperature_for_agent(self, agent_name: str) -> float:
         """获取 Agent 配置的温度"""
-        agent_cfg = self.config.get(f"agents.{agent_name}", {})
-        return agent_cfg.get("temperature", 0.7)
+        return self._agent_temperature.get(agent_name, 0.7)
 
     def get_stats(self) -> Dict[str, Any]:
         """获取统计信息"""
         return {
             "total_requests": self.total_requests,
             "total_tokens": self.total_tokens,
+            "cache_hits": self.cache_hits,
             "available_providers": self.available_providers
         }
 
 
 # 全局实例
 _client: Optional[LLMClient] = None
+_client_lock = threading.Lock()
 
 
 def get_client() -> LLMClient:
-    """获取全局 LLM 客户端"""
+    """获取全局 LLM 客户端（双重检查加锁，避免并发启动时重复创建）"""
     global _client
-    if _client is None:
-        _client = LLMClient()
-    return _client
+    client = _client
+    if client is None:
+        with _client_lock:
+            if _client is None:
+                _client = LLMClient()
+            client = _client
+    return client
 
 
 def reset_client():
     """重置客户端（配置变更后调用）"""
     global _client
-    _client = None
+    with _client_lock:
+        _client = None
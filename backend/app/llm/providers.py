@@ -68,7 +68,7 @@ class OpenAIProvider(BaseProvider):
         response = await client.chat.completions.create(
             model=self.model,
             messages=messages,
-            temperature=temperature or self.temperature,
+            temperature=temperature if temperature is not None else self.temperature,
             max_tokens=max_tokens or self.max_tokens
         )
 
@@ -119,7 +119,7 @@ class AnthropicProvider(BaseProvider):
             max_tokens=max_tokens or self.max_tokens,
             system=system_msg if system_msg else None,
             messages=chat_messages,
-            temperature=temperature or self.temperature
+            temperature=temperature if temperature is not None else self.temperature
         )
 
         return {
@@ -159,7 +159,7 @@ class DeepSeekProvider(BaseProvider):
         response = await client.chat.completions.create(
             model=self.model,
             messages=messages,
-            temperature=temperature or self.temperature,
+            temperature=temperature if temperature is not None else self.temperature,
             max_tokens=max_tokens or self.max_tokens
         )
 
@@ -195,7 +195,7 @@ class CustomProvider(BaseProvider):
         response = await client.chat.completions.create(
             model=self.model,
             messages=messages,
-            temperature=temperature or self.temperature,
+            temperature=temperature if temperature is not None else self.temperature,
             max_tokens=max_tokens or self.max_tokens
         )
 
@@ -0,0 +1,14 @@
+"""
+批量校验适配器
+TypeAdapter 会缓存校验器，批量加载列表时比逐条构造模型更快
+"""
+
+from typing import List
+
+from pydantic import TypeAdapter
+
+from .canon import Fact, TimelineEvent, CharacterState
+
+FACT_LIST = TypeAdapter(List[Fact])
+TIMELINE_LIST = TypeAdapter(List[TimelineEvent])
+STATE_LIST = TypeAdapter(List[CharacterState])
@@ -2,8 +2,14 @@
 事实表模型：事实、时间线、角色状态
 """
 
+import sys
 from typing import List, Dict, Optional
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
+
+
+def _intern(value: str) -> str:
+    """驻留高频重复的短字符串（章节名、重要性等），多条记录共享同一对象"""
+    return sys.intern(value) if isinstance(value, str) else value
 
 
 class Fact(BaseModel):
@@ -15,6 +21,11 @@ class Fact(BaseModel):
     characters: List[str] = Field(default_factory=list)  # 相关角色
     importance: str = "normal"   # 重要性: critical / normal / minor
 
+    @field_validator("source", "importance")
+    @classmethod
+    def _intern_strings(cls, value: str) -> str:
+        return _intern(value)
+
 
 class TimelineEvent(BaseModel):
     """时间线事件"""
@@ -25,6 +36,11 @@ class TimelineEvent(BaseModel):
     location: str = ""
     source: str = ""
 
+    @field_validator("source", "location")
+    @classmethod
+    def _intern_strings(cls, value: str) -> str:
+        return _intern(value)
+
 
 class CharacterState(BaseModel):
     """角色状态（某章节后的状态快照）"""
@@ -36,3 +52,8 @@ class CharacterState(BaseModel):
     inventory: List[str] = Field(default_factory=list)    # 持有物品
     injuries: List[str] = Field(default_factory=list)     # 伤势
     relationships: Dict[str, str] = Field(default_factory=dict)  # 与他人关系变化
+
+    @field_validator("character", "chapter")
+    @classmethod
+    def _intern_strings(cls, value: str) -> str:
+        return _intern(value)
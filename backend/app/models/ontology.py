@@ -3,8 +3,10 @@
 结构化存储小说世界的核心信息，用于高效的上下文管理
 """
 
+import re
+from collections import deque
 from typing import List, Dict, Optional, Set
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr
 from enum import Enum
 
 
@@ -57,6 +59,11 @@ class EventType(str, Enum):
     RELATIONSHIP = "relationship"  # 关系变化
 
 
+# 枚举值查表（Enum.value 是描述符访问，文本化热路径上直接查表）
+_RELATION_VALUE: Dict[RelationType, str] = {rt: rt.value for rt in RelationType}
+_STATUS_VALUE: Dict[CharacterStatus, str] = {st: st.value for st in CharacterStatus}
+
+
 # ==================== 角色关系图 ====================
 
 class Relationship(BaseModel):
@@ -73,7 +80,7 @@ class Relationship(BaseModel):
         """转为文本描述"""
         if self.description:
             return f"{self.source} → {self.target}: {self.description}"
-        return f"{self.source} → {self.target}: {self.relation_type.value}"
+        return f"{self.source} → {self.target}: {_RELATION_VALUE[self.relation_type]}"
 
 
 class CharacterNode(BaseModel):
@@ -95,43 +102,100 @@ class CharacterGraph(BaseModel):
     relationships: List[Relationship] = Field(default_factory=list)
 
     # 索引（不存储，运行时构建）
-    _outgoing_index: Dict[str, List[int]] = {}  # name -> [relationship_indices]
-    _incoming_index: Dict[str, List[int]] = {}
+    _outgoing_index: Dict[str, List[int]] = PrivateAttr(default_factory=dict)  # name -> [relationship_indices]
+    _incoming_index: Dict[str, List[int]] = PrivateAttr(default_factory=dict)
+    _indexed_relationships: Optional[List[Relationship]] = PrivateAttr(default=None)
+    _indexed_count: int = PrivateAttr(default=0)
+    _rel_text: List[str] = PrivateAttr(default_factory=list)  # 与 relationships 对齐的文本缓存
+    _alias_to_canonical: Dict[str, str] = PrivateAttr(default_factory=dict)  # alias -> name
+
+    def model_post_init(self, __context) -> None:
+        self._normalize_aliases()
+
+    def _normalize_aliases(self) -> None:
+        """
+        建立别名索引
+
+        旧数据把别名也作为 nodes 的键存了一份副本，这里将其移出 nodes
+        """
+        for key, node in list(self.nodes.items()):
+            if key != node.name and node.name in self.nodes:
+                del self.nodes[key]
+        self._alias_to_canonical = {}
+        for node in self.nodes.values():
+            for alias in node.aliases:
+                if alias not in self.nodes:
+                    self._alias_to_canonical.setdefault(alias, node.name)
+
+    def resolve(self, name: str) -> str:
+        """将别名解析为角色名（本名优先）"""
+        if name in self.nodes:
+            return name
+        return self._alias_to_canonical.get(name, name)
+
+    def get_node(self, name: str) -> Optional[CharacterNode]:
+        """按角色名或别名获取角色节点"""
+        return self.nodes.get(self.resolve(name))
+
+    def _ensure_index(self) -> None:
+        """同步关系索引（relationships 被整体替换时重建，被追加时增量补齐）"""
+        rels = self.relationships
+        if self._indexed_relationships is not rels or self._indexed_count > len(rels):
+            self._outgoing_index = {}
+            self._incoming_index = {}
+            self._rel_text = []
+            self._indexed_relationships = rels
+            self._indexed_count = 0
+
+        for idx in range(self._indexed_count, len(rels)):
+            rel = rels[idx]
+            self._outgoing_index.setdefault(rel.source, []).append(idx)
+            self._incoming_index.setdefault(rel.target, []).append(idx)
+            self._rel_text.append(rel.to_text())
+        self._indexed_count = len(rels)
+
+    def touch(self) -> None:
+        """关系被原地修改后调用，下次访问时重建索引和文本缓存"""
+        self._indexed_relationships = None
+
+    def _relationship_indices(self, character: str) -> List[int]:
+        """某角色参与的所有关系下标（保持原有顺序）"""
+        self._ensure_index()
+        outgoing = self._outgoing_index.get(character, [])
+        incoming = self._incoming_index.get(character, [])
+        if not incoming:
+            return outgoing
+        if not outgoing:
+            return incoming
+        return sorted(set(outgoing).union(incoming))
 
     def add_character(self, node: CharacterNode) -> None:
         """添加角色"""
         self.nodes[node.name] = node
+        self._alias_to_canonical.pop(node.name, None)
         # 添加别名索引
         for alias in node.aliases:
             if alias not in self.nodes:
-                self.nodes[alias] = node
+                self._alias_to_canonical[alias] = node.name
 
     def add_relationship(self, rel: Relationship) -> None:
         """添加关系"""
+        # 双向关系只存一条，查询时按出入边对称处理，不再追加反向副本
         self.relationships.append(rel)
-        # 如果是双向关系，添加反向
-        if rel.bidirectional:
-            reverse = Relationship(
-                source=rel.target,
-                target=rel.source,
-                relation_type=rel.relation_type,
-                description=rel.description,
-                bidirectional=True,
-                established_at=rel.established_at,
-                ended_at=rel.ended_at
-            )
-            self.relationships.append(reverse)
+        self._ensure_index()
 
     def get_relationships_for(self, character: str) -> List[Relationship]:
         """获取某角色的所有关系"""
-        return [r for r in self.relationships
-                if r.source == character or r.target == character]
+        return [self.relationships[i] for i in self._relationship_indices(character)]
 
     def get_relationships_between(self, char1: str, char2: str) -> List[Relationship]:
         """获取两个角色之间的关系"""
-        return [r for r in self.relationships
-                if (r.source == char1 and r.target == char2) or
-                   (r.source == char2 and r.target == char1)]
+        self._ensure_index()
+        indices = [i for i in self._outgoing_index.get(char1, [])
+                   if self.relationships[i].target == char2]
+        indices += [i for i in self._outgoing_index.get(char2, [])
+                    if self.relationships[i].target == char1]
+        return [self.relationships[i] for i in sorted(set(indices))]
 
     def get_characters_by_group(self, group: str) -> List[str]:
         """获取某组织/阵营的所有角色"""
@@ -143,27 +207,31 @@ class CharacterGraph(BaseModel):
         if source not in self.nodes or target not in self.nodes:
             return []
 
-        visited = {source}
-        queue = [(source, [source])]
+        # parent 记录前驱节点，命中时再回溯路径，避免每步复制整条路径
+        parent: Dict[str, Optional[str]] = {source: None}
+        queue = deque([(source, 1)])  # (角色, 路径长度)
 
         while queue:
-            current, path = queue.pop(0)
-            if len(path) > max_depth:
+            current, depth = queue.popleft()
+            if depth > max_depth:
                 continue
 
-            for rel in self.relationships:
+            for i in self._relationship_indices(current):
+                rel = self.relationships[i]
                 next_char = None
-                if rel.source == current and rel.target not in visited:
+                if rel.source == current and rel.target not in parent:
                     next_char = rel.target
-                elif rel.target == current and rel.source not in visited:
+                elif rel.target == current and rel.source not in parent:
                     next_char = rel.source
 
                 if next_char:
-                    new_path = path + [next_char]
+                    parent[next_char] = current
                     if next_char == target:
-                        return new_path
-                    visited.add(next_char)
-                    queue.append((next_char, new_path))
+                        path = [next_char]
+                        while parent[path[-1]] is not None:
+                            path.append(parent[path[-1]])
+                        return path[::-1]
+                    queue.append((next_char, depth + 1))
 
         return []
 
@@ -173,7 +241,7 @@ class CharacterGraph(BaseModel):
 
         # 筛选相关角色
         if characters:
-            relevant_chars = set(characters)
+            relevant_chars = {self.resolve(c) for c in characters}
             # 添加与这些角色有直接关系的角色
             for rel in self.relationships:
                 if rel.source in relevant_chars:
@@ -190,7 +258,7 @@ class CharacterGraph(BaseModel):
                 node = self.nodes[name]
                 status_str = f"{name}"
                 if node.status != CharacterStatus.ALIVE:
-                    status_str += f"({node.status.value})"
+                    status_str += f"({_STATUS_VALUE[node.status]})"
                 if node.current_location:
                     status_str += f" @{node.current_location}"
                 lines.append(status_str)
@@ -198,12 +266,13 @@ class CharacterGraph(BaseModel):
         # 输出关系
         lines.append("\n[角色关系]")
         seen_rels = set()
-        for rel in self.relationships:
+        self._ensure_index()
+        for i, rel in enumerate(self.relationships):
             if rel.source in relevant_chars or rel.target in relevant_chars:
                 # 避免重复输出双向关系
                 key = tuple(sorted([rel.source, rel.target])) + (rel.relation_type,)
                 if key not in seen_rels:
-                    lines.append(rel.to_text())
+                    lines.append(self._rel_text[i])
                     seen_rels.add(key)
 
         return "\n".join(lines)
@@ -211,6 +280,24 @@ class CharacterGraph(BaseModel):
 
 # ==================== 世界观本体 ====================
 
+# 禁止类规则的否定词，规则中否定词之后的部分视为被禁止的行为
+_PROHIBITION_RE = re.compile(r'不能|禁止|不可')
+# 关键词分隔：标点、空白
+_KEYWORD_SPLIT_RE = re.compile(r'[\s，。、；：！？,.;:!?()（）“”"\'《》\[\]【】]+')
+
+
+def _extract_prohibited_keywords(rule_text: str) -> List[str]:
+    """提取禁止类规则中被禁止行为的关键词（长度大于 1）"""
+    parts = _PROHIBITION_RE.split(rule_text.lower())
+    keywords = []
+    for segment in parts[1:]:
+        # 否定词之后到下一个标点为止
+        head = _KEYWORD_SPLIT_RE.split(segment.strip(), maxsplit=1)[0]
+        if len(head) > 1:
+            keywords.append(head)
+    return keywords
+
+
 class WorldRule(BaseModel):
     """世界规则"""
     id: str = ""
@@ -254,9 +341,48 @@ class WorldOntology(BaseModel):
     # 特殊元素（如魔法体系、科技水平等）
     special_elements: Dict[str, str] = Field(default_factory=dict)
 
+    # 规则关键词匹配器（运行时构建）
+    _rule_matcher: Optional[tuple] = PrivateAttr(default=None)
+
     def add_rule(self, rule: WorldRule) -> None:
         """添加规则"""
         self.rules.append(rule)
+        self._rule_matcher = None
+
+    def _get_rule_matcher(self) -> tuple:
+        """
+        构建所有禁止类规则关键词的合并正则（一次扫描匹配全部关键词）
+
+        Returns:
+            (签名, 正则, 关键词 -> 命中的规则下标列表)
+        """
+        # 签名取各条规则的文本：原地改写规则、同数量替换规则都会触发重建；
+        # 文本未变时比较的是同一批 str 对象，按身份即可判等
+        signature = tuple(rule.rule for rule in self.rules)
+        if self._rule_matcher is not None and self._rule_matcher[0] == signature:
+            return self._rule_matcher
+
+        keyword_rules: Dict[str, List[int]] = {}
+        for i, rule in enumerate(self.rules):
+            for kw in _extract_prohibited_keywords(rule.rule):
+                keyword_rules.setdefault(kw, []).append(i)
+
+        # 同一位置只会命中最长的关键词，把其前缀关键词的规则一并归入
+        for kw, indices in keyword_rules.items():
+            for other, other_indices in keyword_rules.items():
+                if other != kw and kw.startswith(other):
+                    indices.extend(other_indices)
+
+        pattern = None
+        if keyword_rules:
+            alternation = "|".join(
+                re.escape(kw) for kw in sorted(keyword_rules, key=len, reverse=True)
+            )
+            # 零宽前瞻，允许关键词之间重叠
+            pattern = re.compile(f"(?=({alternation}))")
+
+        self._rule_matcher = (signature, pattern, keyword_rules)
+        return self._rule_matcher
 
     def get_immutable_rules(self) -> List[WorldRule]:
         """获取不可违反的规则"""
@@ -264,16 +390,14 @@ class WorldOntology(BaseModel):
 
     def check_rule_violation(self, action: str) -> List[WorldRule]:
         """检查行为是否违反规则（简单关键词匹配，可扩展为语义匹配）"""
-        violations = []
-        action_lower = action.lower()
-        for rule in self.rules:
-            # 简单的否定词检测
-            if "不能" in rule.rule or "禁止" in rule.rule or "不可" in rule.rule:
-                # 提取关键词
-                keywords = [w for w in rule.rule if len(w) > 1]
-                if any(kw in action_lower for kw in keywords):
-                    violations.append(rule)
-        return violations
+        _, pattern, keyword_rules = self._get_rule_matcher()
+        if pattern is None:
+            return []
+
+        matched = set()
+        for match in pattern.finditer(action.lower()):
+            matched.update(keyword_rules[match.group(1)])
+        return [self.rules[i] for i in sorted(matched)]
 
     def to_compact_text(self) -> str:
         """转为紧凑文本"""
@@ -334,20 +458,45 @@ class Timeline(BaseModel):
     current_time: str = ""               # 当前故事时间
 
     # 索引
-    _chapter_index: Dict[str, List[int]] = {}  # chapter -> [event_indices]
-    _character_index: Dict[str, List[int]] = {}  # character -> [event_indices]
+    _chapter_index: Dict[str, List[int]] = PrivateAttr(default_factory=dict)  # chapter -> [event_indices]
+    _character_index: Dict[str, List[int]] = PrivateAttr(default_factory=dict)  # character -> [event_indices]
+    _critical_indices: List[int] = PrivateAttr(default_factory=list)
+    _indexed_events: Optional[List[TimelineEvent]] = PrivateAttr(default=None)
+    _indexed_count: int = PrivateAttr(default=0)
+
+    def _ensure_index(self) -> None:
+        """同步事件索引（events 被整体替换时重建，被追加时增量补齐）"""
+        events = self.events
+        if self._indexed_events is not events or self._indexed_count > len(events):
+            self._chapter_index = {}
+            self._character_index = {}
+            self._critical_indices = []
+            self._indexed_events = events
+            self._indexed_count = 0
+
+        for idx in range(self._indexed_count, len(events)):
+            event = events[idx]
+            self._chapter_index.setdefault(event.source_chapter, []).append(idx)
+            for participant in dict.fromkeys(event.participants):
+                self._character_index.setdefault(participant, []).append(idx)
+            if event.importance == "critical":
+                self._critical_indices.append(idx)
+        self._indexed_count = len(events)
 
     def add_event(self, event: TimelineEvent) -> None:
         """添加事件"""
         self.events.append(event)
+        self._ensure_index()
 
     def get_events_by_chapter(self, chapter: str) -> List[TimelineEvent]:
         """获取某章节的事件"""
-        return [e for e in self.events if e.source_chapter == chapter]
+        self._ensure_index()
+        return [self.events[i] for i in self._chapter_index.get(chapter, [])]
 
     def get_events_for_character(self, character: str) -> List[TimelineEvent]:
         """获取某角色参与的事件"""
-        return [e for e in self.events if character in e.participants]
+        self._ensure_index()
+        return [self.events[i] for i in self._character_index.get(character, [])]
 
     def get_recent_events(self, n: int = 10) -> List[TimelineEvent]:
         """获取最近的事件"""
@@ -355,24 +504,26 @@ class Timeline(BaseModel):
 
     def get_critical_events(self) -> List[TimelineEvent]:
         """获取关键事件"""
-        return [e for e in self.events if e.importance == "critical"]
+        self._ensure_index()
+        return [self.events[i] for i in self._critical_indices]
 
     def to_compact_text(self, characters: List[str] = None, limit: int = 15) -> str:
         """转为紧凑文本"""
         lines = ["[时间线]"]
+        self._ensure_index()
 
-        # 筛选相关事件
+        # 筛选相关事件（角色参与的 + 关键的），按索引合并
         if characters:
-            relevant_events = [
-                e for e in self.events
-                if any(c in e.participants for c in characters) or e.importance == "critical"
-            ]
+            indices = set(self._critical_indices)
+            for c in characters:
+                indices.update(self._character_index.get(c, ()))
+            relevant_indices = sorted(indices)
         else:
-            relevant_events = self.events
+            relevant_indices = range(len(self.events))
 
         # 取最近的 + 关键的
-        critical = [e for e in relevant_events if e.importance == "critical"]
-        recent = relevant_events[-limit:]
+        critical = [self.events[i] for i in self._critical_indices]
+        recent = [self.events[i] for i in relevant_indices[-limit:]]
 
         # 合并去重
         selected = list({e.id or e.event: e for e in critical + recent}.values())
@@ -388,6 +539,15 @@ class Timeline(BaseModel):
 
 # ==================== 聚合的上下文本体 ====================
 
+def _construct(model: type, data: dict, **enums):
+    """跳过校验构造模型，仅将枚举字段还原为枚举值"""
+    data = dict(data)
+    for field_name, enum_cls in enums.items():
+        if field_name in data:
+            data[field_name] = enum_cls(data[field_name])
+    return model.model_construct(**data)
+
+
 class StoryOntology(BaseModel):
     """故事本体（聚合所有结构化信息）"""
     project_id: str
@@ -401,6 +561,54 @@ class StoryOntology(BaseModel):
     last_updated_chapter: str = ""
     version: int = 1
 
+    @classmethod
+    def from_trusted_dict(cls, data: dict) -> "StoryOntology":
+        """
+        从本系统保存的数据重建本体（跳过 pydantic 校验）
+
+        仅用于存储层加载自己写出的文件，外部输入仍应走正常校验
+        """
+        world = data.get("world") or {}
+        graph = data.get("characters") or {}
+        timeline = data.get("timeline") or {}
+
+        world_obj = WorldOntology.model_construct(**{
+            **world,
+            "rules": [WorldRule.model_construct(**r) for r in world.get("rules") or []],
+            "locations": {
+                k: Location.model_construct(**v) for k, v in (world.get("locations") or {}).items()
+            },
+            "factions": {
+                k: Faction.model_construct(**v) for k, v in (world.get("factions") or {}).items()
+            },
+        })
+
+        graph_obj = CharacterGraph.model_construct(
+            nodes={
+                k: _construct(CharacterNode, v, status=CharacterStatus)
+                for k, v in (graph.get("nodes") or {}).items()
+            },
+            relationships=[
+                _construct(Relationship, r, relation_type=RelationType)
+                for r in graph.get("relationships") or []
+            ],
+        )
+
+        timeline_obj = Timeline.model_construct(**{
+            **timeline,
+            "events": [
+                _construct(TimelineEvent, e, event_type=EventType)
+                for e in timeline.get("events") or []
+            ],
+        })
+
+        return cls.model_construct(**{
+            **data,
+            "world": world_obj,
+            "characters": graph_obj,
+            "timeline": timeline_obj,
+        })
+
     def get_context_for_writing(
         self,
         chapter_characters: List[str] = None,
@@ -1,11 +1,19 @@
 """
 服务层 (Services)
 本体提取、统计分析、导出等服务
+
+导出项按需导入（PEP 562），只用到导出服务时不会连带加载 LLM 客户端等模块
 """
 
-from .ontology_extractor import OntologyExtractor, get_extractor
-from .statistics import StatisticsService
-from .exporter import ExportService
+import importlib
+
+# 导出名 -> 所在子模块
+_LAZY_EXPORTS = {
+    "OntologyExtractor": ".ontology_extractor",
+    "get_extractor": ".ontology_extractor",
+    "StatisticsService": ".statistics",
+    "ExportService": ".exporter",
+}
 
 __all__ = [
     "OntologyExtractor",
@@ -13,3 +21,16 @@ __all__ = [
     "StatisticsService",
     "ExportService",
 ]
+
+
+def __getattr__(name: str):
+    module_name = _LAZY_EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
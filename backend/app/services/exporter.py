@@ -3,14 +3,90 @@
 支持导出整本小说为 TXT / Markdown / EPUB 格式
 """
 
+import asyncio
 import io
+import re
 import zipfile
 from pathlib import Path
-from typing import List, Optional, Tuple
+from typing import Dict, Iterator, List, Optional, Tuple
 from dataclasses import dataclass
 from enum import Enum
 
 from app.storage import ProjectStorage, DraftStorage
+from app.utils.helpers import count_words
+
+
+# 非空行（段落）匹配
+_PARAGRAPH_RE = re.compile(r'[^\n]+')
+
+
+# XML 转义表（单次扫描完成全部替换）
+_XML_ESCAPE_TABLE = str.maketrans({
+    "&": "&amp;",
+    "<": "&lt;",
+    ">": "&gt;",
+    '"': "&quot;",
+    "'": "&apos;",
+})
+
+
+# EPUB 中固定不变的文件，预先编码为字节
+_CONTAINER_XML = b'''<?xml version="1.0" encoding="UTF-8"?>
+<container version="1.0" xmlns="urn:oasis:names:tc:opendocument:xmlns:container">
+  <rootfiles>
+    <rootfile full-path="OEBPS/content.opf" media-type="application/oebps-package+xml"/>
+  </rootfiles>
+</container>'''
+
+_STYLE_CSS = """body {
+    font-family: "Source Han Serif CN", "Noto Serif CJK SC", serif;
+    line-height: 1.8;
+    margin: 1em;
+    text-align: justify;
+}
+
+h1 {
+    font-size: 2em;
+    text-align: center;
+    margin: 2em 0 1em 0;
+}
+
+h2 {
+    font-size: 1.5em;
+    margin: 1.5em 0 1em 0;
+    border-bottom: 1px solid #ccc;
+    padding-bottom: 0.3em;
+}
+
+p {
+    text-indent: 2em;
+    margin: 0.5em 0;
+}
+
+.title-page {
+    text-align: center;
+    padding-top: 30%;
+}
+
+.title-page h1 {
+    font-size: 2.5em;
+    margin-bottom: 1em;
+}
+
+.title-page .description {
+    font-style: italic;
+    color: #666;
+    margin-top: 2em;
+}
+""".encode("utf-8")
+
+
+def _iter_paragraphs(content: str):
+    """逐个产出去除首尾空白后的非空段落，不构建整章的行列表"""
+    for match in _PARAGRAPH_RE.finditer(content):
+        para = match.group().strip()
+        if para:
+            yield para
 
 
 class ExportFormat(str, Enum):
@@ -38,16 +114,40 @@ class ExportResult:
     chapter_count: int
 
 
+@dataclass
+class ExportStream:
+    """流式导出结果（内容按块产出，不在内存中拼出整个文件）"""
+    filename: str
+    chunks: Iterator[bytes]
+    content_type: str
+    total_words: int
+    chapter_count: int
+
+
 class ExportService:
     """导出服务"""
 
+    # 导出时并发读取章节的上限
+    MAX_CONCURRENT_READS = 32
+
+    # 章节内容缓存的最大条目数（按 项目 × 是否成稿 计）
+    MAX_CACHED_PROJECTS = 8
+
     def __init__(self, data_dir: str = "../data"):
         self.projects = ProjectStorage(data_dir)
         self.drafts = DraftStorage(data_dir)
+        # (project_id, use_final) -> (目录指纹, 章节列表)
+        self._chapter_cache: Dict[Tuple[str, bool], Tuple[tuple, List[ChapterContent]]] = {}
+        self._chapter_locks: Dict[Tuple[str, bool], asyncio.Lock] = {}
+
+    def invalidate(self, project_id: str) -> None:
+        """丢弃某项目的章节缓存"""
+        for key in [k for k in self._chapter_cache if k[0] == project_id]:
+            del self._chapter_cache[key]
 
     async def get_all_chapters(self, project_id: str, use_final: bool = True) -> List[ChapterContent]:
         """
-        获取项目的所有章节内容
+        获取项目的所有章节内容（草稿目录未变化时复用上次读取的结果）
 
         Args:
             project_id: 项目 ID
@@ -56,149 +156,157 @@ class ExportService:
         Returns:
             章节内容列表（已排序）
         """
-        chapters = await self.drafts.list_chapters(project_id)
-        result = []
+        key = (project_id, use_final)
+        lock = self._chapter_locks.setdefault(key, asyncio.Lock())
 
-        for chapter in chapters:
-            content = None
+        # 同一项目的并发请求只读取一次
+        async with lock:
+            fingerprint = self.drafts.fingerprint(project_id)
+            cached = self._chapter_cache.get(key)
+            if cached is not None and cached[0] == fingerprint:
+                return list(cached[1])
 
-            if use_final:
-                # 优先使用成稿
-                content = await self.drafts.get_final(project_id, chapter)
+            chapters = await self._load_all_chapters(project_id, use_final)
 
-            if content is None:
-                # 没有成稿则使用最新草稿
-                draft = await self.drafts.get_latest_draft(project_id, chapter)
-                if draft:
-                    content = draft.content
+            self._chapter_cache.pop(key, None)
+            if len(self._chapter_cache) >= self.MAX_CACHED_PROJECTS:
+                self._chapter_cache.pop(next(iter(self._chapter_cache)))
+            self._chapter_cache[key] = (fingerprint, chapters)
+            return list(chapters)
 
-            if content:
-                # 获取章节摘要中的标题（如果有）
-                summary = await self.drafts.get_summary(project_id, chapter)
-                title = ""
-                if summary and hasattr(summary, 'title'):
-                    title = summary.title or ""
+    async def _load_all_chapters(self, project_id: str, use_final: bool) -> List[ChapterContent]:
+        """
+        读取项目的所有章节内容
 
-                result.append(ChapterContent(
-                    chapter=chapter,
-                    title=title,
-                    content=content,
-                    word_count=len(content)
-                ))
+        Args:
+            project_id: 项目 ID
+            use_final: True 使用成稿，False 使用最新草稿
 
-        return result
+        Returns:
+            章节内容列表（已排序）
+        """
+        chapters = await self.drafts.list_chapters(project_id)
+        semaphore = asyncio.Semaphore(self.MAX_CONCURRENT_READS)
+
+        async def load_one(chapter: str) -> Optional[ChapterContent]:
+            async with semaphore:
+                # 成稿与摘要互不依赖，并发读取
+                if use_final:
+                    # 优先使用成稿
+                    content, summary = await asyncio.gather(
+                        self.drafts.get_final(project_id, chapter),
+                        self.drafts.get_summary(project_id, chapter)
+                    )
+                else:
+                    content = None
+                    summary = await self.drafts.get_summary(project_id, chapter)
+
+                if content is None:
+                    # 没有成稿则使用最新草稿
+                    draft = await self.drafts.get_latest_draft(project_id, chapter)
+                    if draft:
+                        content = draft.content
+
+            if not content:
+                return None
+
+            # 获取章节摘要中的标题（如果有）
+            title = ""
+            if summary and hasattr(summary, 'title'):
+                title = summary.title or ""
+
+            return ChapterContent(
+                chapter=chapter,
+                title=title,
+                content=content,
+                word_count=count_words(content)
+            )
 
-    async def export_txt(self, project_id: str, use_final: bool = True) -> ExportResult:
-        """导出为 TXT 格式"""
+        results = await asyncio.gather(*(load_one(chapter) for chapter in chapters))
+        return [r for r in results if r is not None]
+
+    async def _load_for_export(self, project_id: str, use_final: bool):
+        """读取导出所需的项目和章节"""
         project = await self.projects.get_project(project_id)
         if not project:
             raise ValueError(f"项目不存在: {project_id}")
 
         chapters = await self.get_all_chapters(project_id, use_final)
+        return project, chapters
 
-        lines = []
-
+    def _iter_txt(self, project, chapters: List[ChapterContent]) -> Iterator[str]:
+        """逐段产出 TXT 内容，每行以前置换行衔接（等价于按行 join）"""
         # 标题
-        lines.append(project.name)
-        lines.append("=" * 40)
-        lines.append("")
+        yield f"{project.name}\n{'=' * 40}\n"
 
         # 简介（如果有）
         if project.description:
-            lines.append(project.description)
-            lines.append("")
-            lines.append("-" * 40)
-            lines.append("")
+            yield f"\n{project.description}\n\n{'-' * 40}\n"
 
         # 章节内容
-        total_words = 0
         for ch in chapters:
             # 章节标题
-            if ch.title:
-                lines.append(f"{ch.chapter} {ch.title}")
-            else:
-                lines.append(ch.chapter)
-            lines.append("")
+            heading = f"{ch.chapter} {ch.title}" if ch.title else ch.chapter
 
             # 正文
-            lines.append(ch.content)
-            lines.append("")
-            lines.append("")
-
-            total_words += ch.word_count
-
-        content = "\n".join(lines)
-
-        return ExportResult(
-            filename=f"{project.name}.txt",
-            content=content.encode("utf-8"),
-            content_type="text/plain; charset=utf-8",
-            total_words=total_words,
-            chapter_count=len(chapters)
-        )
-
-    async def export_markdown(self, project_id: str, use_final: bool = True) -> ExportResult:
-        """导出为 Markdown 格式"""
-        project = await self.projects.get_project(project_id)
-        if not project:
-            raise ValueError(f"项目不存在: {project_id}")
-
-        chapters = await self.get_all_chapters(project_id, use_final)
-
-        lines = []
+            yield f"\n{heading}\n\n{ch.content}\n\n"
 
+    def _iter_markdown(self, project, chapters: List[ChapterContent]) -> Iterator[str]:
+        """逐段产出 Markdown 内容"""
         # 标题
-        lines.append(f"# {project.name}")
-        lines.append("")
+        yield f"# {project.name}\n"
 
         # 简介
         if project.description:
-            lines.append(f"> {project.description}")
-            lines.append("")
+            yield f"\n> {project.description}\n"
 
         # 目录
-        lines.append("## 目录")
-        lines.append("")
+        yield "\n## 目录\n"
         for i, ch in enumerate(chapters, 1):
             anchor = ch.chapter.replace(" ", "-").lower()
             if ch.title:
-                lines.append(f"{i}. [{ch.chapter} {ch.title}](#{anchor})")
+                yield f"\n{i}. [{ch.chapter} {ch.title}](#{anchor})"
             else:
-                lines.append(f"{i}. [{ch.chapter}](#{anchor})")
-        lines.append("")
-        lines.append("---")
-        lines.append("")
+                yield f"\n{i}. [{ch.chapter}](#{anchor})"
+        yield "\n\n---\n"
 
         # 章节内容
-        total_words = 0
         for ch in chapters:
             # 章节标题
             if ch.title:
-                lines.append(f"## {ch.chapter} {ch.title}")
+                yield f"\n## {ch.chapter} {ch.title}\n"
             else:
-                lines.append(f"## {ch.chapter}")
-            lines.append("")
+                yield f"\n## {ch.chapter}\n"
 
             # 正文（按段落处理）
-            paragraphs = ch.content.split("\n")
-            for para in paragraphs:
-                para = para.strip()
-                if para:
-                    lines.append(para)
-                    lines.append("")
+            for para in _iter_paragraphs(ch.content):
+                yield f"\n{para}\n"
+
+            yield "\n---\n"
 
-            lines.append("---")
-            lines.append("")
+    async def export_txt(self, project_id: str, use_final: bool = True) -> ExportResult:
+        """导出为 TXT 格式"""
+        project, chapters = await self._load_for_export(project_id, use_final)
+        content = "".join(self._iter_txt(project, chapters))
 
-            total_words += ch.word_count
+        return ExportResult(
+            filename=f"{project.name}.txt",
+            content=content.encode("utf-8"),
+            content_type="text/plain; charset=utf-8",
+            total_words=sum(ch.word_count for ch in chapters),
+            chapter_count=len(chapters)
+        )
 
-        content = "\n".join(lines)
+    async def export_markdown(self, project_id: str, use_final: bool = True) -> ExportResult:
+        """导出为 Markdown 格式"""
+        project, chapters = await self._load_for_export(project_id, use_final)
+        content = "".join(self._iter_markdown(project, chapters))
 
         return ExportResult(
             filename=f"{project.name}.md",
             content=content.encode("utf-8"),
             content_type="text/markdown; charset=utf-8",
-            total_words=total_words,
+            total_words=sum(ch.word_count for ch in chapters),
             chapter_count=len(chapters)
         )
 
@@ -213,11 +321,7 @@ class ExportService:
         - OEBPS/toc.ncx
         - OEBPS/chapter_*.xhtml
         """
-        project = await self.projects.get_project(project_id)
-        if not project:
-            raise ValueError(f"项目不存在: {project_id}")
-
-        chapters = await self.get_all_chapters(project_id, use_final)
+        project, chapters = await self._load_for_export(project_id, use_final)
 
         # 创建内存中的 ZIP 文件
         epub_buffer = io.BytesIO()
@@ -227,13 +331,7 @@ class ExportService:
             epub.writestr("mimetype", "application/epub+zip", compress_type=zipfile.ZIP_STORED)
 
             # 2. META-INF/container.xml
-            container_xml = '''<?xml version="1.0" encoding="UTF-8"?>
-<container version="1.0" xmlns="urn:oasis:names:tc:opendocument:xmlns:container">
-  <rootfiles>
-    <rootfile full-path="OEBPS/content.opf" media-type="application/oebps-package+xml"/>
-  </rootfiles>
-</container>'''
-            epub.writestr("META-INF/container.xml", container_xml)
+            epub.writestr("META-INF/container.xml", _CONTAINER_XML)
 
             # 3. OEBPS/content.opf
             content_opf = self._generate_content_opf(project, chapters)
@@ -252,11 +350,11 @@ class ExportService:
             epub.writestr("OEBPS/title.xhtml", title_xhtml)
 
             # 7. OEBPS/chapter_*.xhtml (章节内容)
-            total_words = 0
             for i, ch in enumerate(chapters):
-                chapter_xhtml = self._generate_chapter_xhtml(ch, i + 1)
-                epub.writestr(f"OEBPS/chapter_{i+1:03d}.xhtml", chapter_xhtml)
-                total_words += ch.word_count
+                # 逐段写入压缩流，不在内存中拼出整章 XHTML
+                with epub.open(f"OEBPS/chapter_{i+1:03d}.xhtml", "w") as fp:
+                    for piece in self._iter_chapter_xhtml(ch):
+                        fp.write(piece.encode("utf-8"))
 
         epub_buffer.seek(0)
 
@@ -264,7 +362,7 @@ class ExportService:
             filename=f"{project.name}.epub",
             content=epub_buffer.read(),
             content_type="application/epub+zip",
-            total_words=total_words,
+            total_words=sum(ch.word_count for ch in chapters),
             chapter_count=len(chapters)
         )
 
@@ -337,49 +435,9 @@ class ExportService:
   </navMap>
 </ncx>'''
 
-    def _generate_style_css(self) -> str:
-        """生成样式表"""
-        return '''body {
-    font-family: "Source Han Serif CN", "Noto Serif CJK SC", serif;
-    line-height: 1.8;
-    margin: 1em;
-    text-align: justify;
-}
-
-h1 {
-    font-size: 2em;
-    text-align: center;
-    margin: 2em 0 1em 0;
-}
-
-h2 {
-    font-size: 1.5em;
-    margin: 1.5em 0 1em 0;
-    border-bottom: 1px solid #ccc;
-    padding-bottom: 0.3em;
-}
-
-p {
-    text-indent: 2em;
-    margin: 0.5em 0;
-}
-
-.title-page {
-    text-align: center;
-    padding-top: 30%;
-}
-
-.title-page h1 {
-    font-size: 2.5em;
-    margin-bottom: 1em;
-}
-
-.title-page .description {
-    font-style: italic;
-    color: #666;
-    margin-top: 2em;
-}
-'''
+    def _generate_style_css(self) -> bytes:
+        """生成样式表（预编码的固定内容）"""
+        return _STYLE_CSS
 
     def _generate_title_page(self, project) -> str:
         """生成封面页"""
@@ -403,18 +461,13 @@ p {
 
     def _generate_chapter_xhtml(self, chapter: ChapterContent, index: int) -> str:
         """生成章节 XHTML"""
-        title = f"{chapter.chapter} {chapter.title}" if chapter.title else chapter.chapter
+        return "".join(self._iter_chapter_xhtml(chapter))
 
-        # 将内容转换为段落
-        paragraphs = []
-        for line in chapter.content.split("\n"):
-            line = line.strip()
-            if line:
-                paragraphs.append(f"<p>{self._escape_xml(line)}</p>")
-
-        content = "\n".join(paragraphs)
+    def _iter_chapter_xhtml(self, chapter: ChapterContent):
+        """逐段产出章节 XHTML，供流式写入 ZIP"""
+        title = f"{chapter.chapter} {chapter.title}" if chapter.title else chapter.chapter
 
-        return f'''<?xml version="1.0" encoding="UTF-8"?>
+        yield f'''<?xml version="1.0" encoding="UTF-8"?>
 <!DOCTYPE html>
 <html xmlns="http://www.w3.org/1999/xhtml" xml:lang="zh-CN">
 <head>
@@ -424,7 +477,15 @@ p {
 </head>
 <body>
     <h2>{self._escape_xml(title)}</h2>
-    {content}
+    '''
+
+        # 将内容转换为段落
+        separator = ""
+        for para in _iter_paragraphs(chapter.content):
+            yield f"{separator}<p>{self._escape_xml(para)}</p>"
+            separator = "\n"
+
+        yield '''
 </body>
 </html>'''
 
@@ -432,12 +493,7 @@ p {
         """转义 XML 特殊字符"""
         if not text:
             return ""
-        return (text
-                .replace("&", "&amp;")
-                .replace("<", "&lt;")
-                .replace(">", "&gt;")
-                .replace('"', "&quot;")
-                .replace("'", "&apos;"))
+        return text.translate(_XML_ESCAPE_TABLE)
 
     async def export(
         self,
@@ -464,3 +520,50 @@ p {
             return await self.export_epub(project_id, use_final)
         else:
             raise ValueError(f"不支持的导出格式: {format}")
+
+    async def export_stream(
+        self,
+        project_id: str,
+        format: ExportFormat,
+        use_final: bool = True
+    ) -> ExportStream:
+        """
+        流式导出项目
+
+        TXT / Markdown 按章节逐块编码产出，不拼出整个文件；
+        EPUB 需要 ZIP 中央目录，仍整体生成后一次产出
+
+        Args:
+            project_id: 项目 ID
+            format: 导出格式
+            use_final: 是否使用成稿（否则用最新草稿）
+
+        Returns:
+            流式导出结果
+        """
+        if format == ExportFormat.EPUB:
+            result = await self.export_epub(project_id, use_final)
+            return ExportStream(
+                filename=result.filename,
+                chunks=iter((result.content,)),
+                content_type=result.content_type,
+                total_words=result.total_words,
+                chapter_count=result.chapter_count
+            )
+
+        if format == ExportFormat.TXT:
+            pieces, suffix, content_type = self._iter_txt, "txt", "text/plain; charset=utf-8"
+        elif format == ExportFormat.MARKDOWN:
+            pieces, suffix, content_type = self._iter_markdown, "md", "text/markdown; charset=utf-8"
+        else:
+            raise ValueError(f"不支持的导出格式: {format}")
+
+        project, chapters = await self._load_for_export(project_id, use_final)
+
+        return ExportStream(
+            filename=f"{project.name}.{suffix}",
+            chunks=(piece.encode("utf-8") for piece in pieces(project, chapters)),
+            content_type=content_type,
+            total_words=sum(ch.word_count for ch in chapters),
+            chapter_count=len(chapters)
+        )
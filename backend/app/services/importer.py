@@ -4,18 +4,140 @@
 自动分解章节、分析世界观和文风
 """
 
+import codecs
 import io
+import mmap
+import os
 import re
+import threading
 import zipfile
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import List, Optional, Tuple, Dict, Any
 from dataclasses import dataclass, field
 from enum import Enum
-from bs4 import BeautifulSoup
 
 logger = logging.getLogger(__name__)
 
+# TXT 候选编码（按优先级）。gb2312 是 gbk 的子集，gbk 解码失败时它必然也失败，不再单独尝试
+TXT_ENCODINGS = ('utf-8', 'gbk', 'gb18030', 'big5')
+
+# 编码探测只解码文件开头这么多字节：开头就解不通的编码，整份文件也必然解不通
+ENCODING_PROBE_BYTES = 4096
+
+# OPF 只需要元数据、清单和阅读顺序，其余节点不构建
+_OPF_TAGS = ['metadata', 'manifest', 'spine', 'title', 'creator', 'description']
+# Markdown 链接、图片（不跨行，与逐行处理一致）
+_MD_LINK_RE = re.compile(r'\[([^\]\n]+)\]\([^)\n]+\)')
+_MD_IMAGE_RE = re.compile(r'!\[([^\]\n]*)\]\([^)\n]+\)')
+# 不输出文本的标签
+_SKIP_TEXT_TAGS = frozenset(['script', 'style'])
+
+# 章节标题后处理用到的正则
+_CN_CHAPTER_NAME_RE = re.compile(r'(第[零一二三四五六七八九十百千万〇\d]+章)')
+# 标题前要去掉的标点和空白（空白与正则 \s 一致，最大的空白字符是 U+3000）
+_TITLE_STRIP_CHARS = '：:.' + ''.join(c for c in map(chr, range(0x3001)) if c.isspace())
+_NUM_CHAPTER_RE = re.compile(r'^(\d+)[、.．。]\s*(.*)')
+_EN_CHAPTER_RE = re.compile(r'Chapter\s*(\d+)\s*[：:.]?\s*(.*)', re.IGNORECASE)
+_SPECIAL_CHAPTERS = frozenset(['序章', '序', '楔子', '引子', '尾声', '番外', '后记'])
+
+# 可能是章节标题的行（行首字符能匹配某个章节模式），只对这些行做完整匹配
+_CHAPTER_CANDIDATE_RE = re.compile(r'^[^\S\n]*(?:[第章卷篇C序楔引尾番后]|\d)', re.MULTILINE)
+# 只含空白的行
+_BLANK_LINE_RE = re.compile(r'^[^\S\n]+$', re.MULTILINE)
+
+# bs4 / lxml 只在解析 EPUB 时才导入，TXT / Markdown 导入不付出加载成本
+_opf_strainer = None
+# lxml 的解析器对象不能跨线程共用，EPUB 读取线程池里每个线程各建一个
+_html_parsers = threading.local()
+
+
+def _get_opf_strainer():
+    """OPF 解析的节点筛选器"""
+    global _opf_strainer
+    if _opf_strainer is None:
+        from bs4 import SoupStrainer
+        _opf_strainer = SoupStrainer(_OPF_TAGS)
+    return _opf_strainer
+
+
+def _get_html_parser():
+    """当前线程的章节 HTML 解析器（按字节解析，兼容带 encoding 声明的 XHTML）"""
+    parser = getattr(_html_parsers, 'parser', None)
+    if parser is None:
+        from lxml import html as lxml_html
+        parser = _html_parsers.parser = lxml_html.HTMLParser(encoding='utf-8')
+    return parser
+
+
+def _group_spans(patterns: List[re.Pattern]) -> Dict[int, Tuple[int, int]]:
+    """各模式外包一层分组并用 | 连接后，外层分组号 -> (内层起始下标, 内层分组数)"""
+    spans = {}
+    index = 1
+    for pattern in patterns:
+        spans[index] = (index, pattern.groups)
+        index += pattern.groups + 1
+    return spans
+
+
+# EPUB 章节解压 + HTML 解析的线程数（zlib 解压和 libxml2 解析期间释放 GIL）
+EPUB_PARSE_WORKERS = min(8, os.cpu_count() or 1)
+
+
+def _decode_text(content: bytes) -> str:
+    """按候选编码解码文本，先用开头片段排除不可能的编码，再对整份内容解码"""
+    head = content[:ENCODING_PROBE_BYTES]
+    for encoding in TXT_ENCODINGS:
+        try:
+            # 增量解码，片段末尾被截断的多字节字符不算错误
+            codecs.getincrementaldecoder(encoding)().decode(head, final=False)
+        except UnicodeDecodeError:
+            continue
+        try:
+            return str(content, encoding)
+        except UnicodeDecodeError:
+            continue
+
+    # 强制使用 utf-8，忽略错误
+    return str(content, 'utf-8', 'ignore')
+
+
+class _MmapReader(io.RawIOBase):
+    """mmap 的只读文件对象包装（zipfile / pypdf 需要 seekable 等方法，mmap 本身没有）"""
+
+    def __init__(self, mm: mmap.mmap):
+        self._mm = mm
+        self._mm.seek(0)
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        self._mm.seek(offset, whence)
+        return self._mm.tell()
+
+    def tell(self) -> int:
+        return self._mm.tell()
+
+    def read(self, size: int = -1) -> bytes:
+        return self._mm.read(size if size is not None and size >= 0 else None)
+
+    def readinto(self, buffer) -> int:
+        data = self._mm.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+
+def _open_binary(content):
+    """以文件对象形式读取内容：mmap 包装后按需换页读取，bytes 包装为 BytesIO"""
+    if isinstance(content, mmap.mmap):
+        return _MmapReader(content)
+    return io.BytesIO(content)
+
 
 class ImportFormat(str, Enum):
     TXT = "txt"
@@ -24,6 +146,22 @@ class ImportFormat(str, Enum):
     PDF = "pdf"
 
 
+# 文件头魔数 -> 格式
+_MAGIC_FORMATS = {
+    b'PK\x03\x04': ImportFormat.EPUB,  # ZIP 文件头（EPUB）
+    b'%PDF': ImportFormat.PDF,
+}
+
+# 扩展名 -> 格式
+_EXTENSION_FORMATS = {
+    'txt': ImportFormat.TXT,
+    'md': ImportFormat.MARKDOWN,
+    'markdown': ImportFormat.MARKDOWN,
+    'epub': ImportFormat.EPUB,
+    'pdf': ImportFormat.PDF,
+}
+
+
 @dataclass
 class ParsedChapter:
     """解析出的章节"""
@@ -86,33 +224,46 @@ class NovelParser:
         r'^(序章|序|楔子|引子|尾声|番外|后记)\s*[：:.]?\s*(.*)$',
     ]
 
-    def __init__(self):
-        self.chapter_patterns = [re.compile(p, re.MULTILINE) for p in self.CHAPTER_PATTERNS]
+    # 模式固定不变，类加载时编译一次
+    _COMPILED_PATTERNS = [re.compile(p, re.MULTILINE) for p in CHAPTER_PATTERNS]
+
+    # 所有模式合并为一个交替正则，按原顺序取第一个能匹配的模式；
+    # 每个模式外包一层分组，match.lastindex 即命中模式的外层分组号
+    _MASTER_RE = re.compile('|'.join(f'({p})' for p in CHAPTER_PATTERNS), re.MULTILINE)
+
+    # 外层分组号 -> (内层起始下标, 内层分组数)
+    _PATTERN_GROUPS = _group_spans(_COMPILED_PATTERNS)
 
     def detect_format(self, filename: str, content: bytes) -> ImportFormat:
-        """检测文件格式"""
-        filename_lower = filename.lower()
-
-        if filename_lower.endswith('.txt'):
-            return ImportFormat.TXT
-        elif filename_lower.endswith('.md') or filename_lower.endswith('.markdown'):
-            return ImportFormat.MARKDOWN
-        elif filename_lower.endswith('.epub'):
-            return ImportFormat.EPUB
-        elif filename_lower.endswith('.pdf'):
-            return ImportFormat.PDF
-
-        # 尝试从内容检测
-        if content[:4] == b'PK\x03\x04':  # ZIP 文件头（EPUB）
-            return ImportFormat.EPUB
-        if content[:4] == b'%PDF':
-            return ImportFormat.PDF
+        """检测文件格式（先看文件头魔数，再看扩展名）"""
+        format = _MAGIC_FORMATS.get(content[:4])
+        if format is not None:
+            return format
+
+        _, dot, ext = filename.rpartition('.')
+        if dot:
+            format = _EXTENSION_FORMATS.get(ext.lower())
+            if format is not None:
+                return format
 
         # 默认当作文本处理
         return ImportFormat.TXT
 
+    def parse_file(self, path: str, filename: Optional[str] = None) -> ParsedNovel:
+        """
+        解析磁盘上的小说文件
+
+        文件以只读 mmap 方式交给解析器，由内核按需换页，不把整个文件读成 bytes
+        """
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                # 空文件无法映射
+                return self.parse(filename or path, b'')
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return self.parse(filename or path, mm)
+
     def parse(self, filename: str, content: bytes) -> ParsedNovel:
-        """解析小说文件"""
+        """解析小说文件（content 可以是 bytes 或只读 mmap）"""
         format = self.detect_format(filename, content)
 
         if format == ImportFormat.TXT:
@@ -129,17 +280,7 @@ class NovelParser:
     def parse_txt(self, filename: str, content: bytes) -> ParsedNovel:
         """解析 TXT 文件"""
         # 尝试多种编码
-        text = None
-        for encoding in ['utf-8', 'gbk', 'gb2312', 'gb18030', 'big5']:
-            try:
-                text = content.decode(encoding)
-                break
-            except (UnicodeDecodeError, LookupError):
-                continue
-
-        if text is None:
-            # 强制使用 utf-8，忽略错误
-            text = content.decode('utf-8', errors='ignore')
+        text = _decode_text(content)
 
         # 从文件名推断书名
         title = Path(filename).stem
@@ -148,7 +289,7 @@ class NovelParser:
 
     def parse_markdown(self, filename: str, content: bytes) -> ParsedNovel:
         """解析 Markdown 文件"""
-        text = content.decode('utf-8', errors='ignore')
+        text = str(content, 'utf-8', 'ignore')
 
         # 从文件名推断书名
         title = Path(filename).stem
@@ -182,13 +323,12 @@ class NovelParser:
                     title = potential_title
                 continue
 
-            # 移除链接、图片等
-            line = re.sub(r'\[([^\]]+)\]\([^)]+\)', r'\1', line)
-            line = re.sub(r'!\[([^\]]*)\]\([^)]+\)', '', line)
-
             cleaned_lines.append(line)
 
+        # 移除链接、图片等（对全文各扫描一次）
         text = '\n'.join(cleaned_lines)
+        text = _MD_LINK_RE.sub(r'\1', text)
+        text = _MD_IMAGE_RE.sub('', text)
 
         return self._parse_text_content(title, text)
 
@@ -200,7 +340,10 @@ class NovelParser:
         chapters_content = []
 
         try:
-            with zipfile.ZipFile(io.BytesIO(content), 'r') as epub:
+            with zipfile.ZipFile(_open_binary(content), 'r') as epub:
+                # 中央目录只解析一次，按路径直接取 ZipInfo
+                info_by_path = {info.filename: info for info in epub.infolist()}
+
                 # 读取 content.opf 获取元数据和阅读顺序
                 opf_path = None
 
@@ -216,7 +359,7 @@ class NovelParser:
                 # 尝试常见路径
                 if not opf_path:
                     for path in ['OEBPS/content.opf', 'content.opf', 'OPS/content.opf']:
-                        if path in epub.namelist():
+                        if path in info_by_path:
                             opf_path = path
                             break
 
@@ -227,7 +370,8 @@ class NovelParser:
                         opf_dir = ''
 
                     # 解析元数据
-                    soup = BeautifulSoup(opf_content, 'xml')
+                    from bs4 import BeautifulSoup
+                    soup = BeautifulSoup(opf_content, 'lxml-xml', parse_only=_get_opf_strainer())
 
                     title_tag = soup.find('dc:title') or soup.find('title')
                     if title_tag:
@@ -254,35 +398,77 @@ class NovelParser:
                             if item_id and href:
                                 id_to_href[item_id] = href
 
-                        # 按阅读顺序读取内容
+                        # 按阅读顺序收集内容路径
+                        full_paths = []
                         for itemref in spine.find_all('itemref'):
                             idref = itemref.get('idref')
                             if idref and idref in id_to_href:
                                 href = id_to_href[idref]
                                 if opf_dir:
-                                    full_path = f"{opf_dir}/{href}"
+                                    full_paths.append(f"{opf_dir}/{href}")
                                 else:
-                                    full_path = href
+                                    full_paths.append(href)
 
-                                try:
-                                    html_content = epub.read(full_path).decode('utf-8')
-                                    text = self._html_to_text(html_content)
-                                    if text.strip():
-                                        chapters_content.append(text)
-                                except (KeyError, UnicodeDecodeError) as e:
-                                    logger.warning(f"无法读取 EPUB 内容 {full_path}: {e}")
+                        # 多线程解压并转换，map 保持阅读顺序
+                        texts = self._read_epub_texts(epub, info_by_path, full_paths)
+                        chapters_content.extend(text for text in texts if text and text.strip())
 
         except zipfile.BadZipFile:
             raise ValueError("无效的 EPUB 文件")
 
-        # 合并所有内容，重新解析章节
-        full_text = '\n\n'.join(chapters_content)
+        # 按阅读顺序逐段解析章节，不拼接全文
+        texts = [text.replace('\r\n', '\n').replace('\r', '\n') for text in chapters_content]
+        chapters = self._split_chapters_across(texts)
 
-        novel = self._parse_text_content(title, full_text)
-        novel.author = author
-        novel.description = description
+        # 没有识别出章节标题时，整体作为一章（与 TXT 导入一致）
+        if not chapters:
+            chapters = [ParsedChapter(chapter_name="全文", title="", content='\n\n'.join(texts).strip())]
 
-        return novel
+        return ParsedNovel(
+            title=title,
+            author=author,
+            description=description,
+            chapters=chapters,
+            raw_content=self._head_text(texts, 50000)  # 保留前5万字用于AI分析
+        )
+
+    def _head_text(self, texts: List[str], limit: int) -> str:
+        """以空行连接各段时的前 limit 个字符（只拼接需要的部分）"""
+        parts = []
+        length = 0
+        for text in texts:
+            if parts:
+                parts.append('\n\n')
+                length += 2
+            parts.append(text)
+            length += len(text)
+            if length >= limit:
+                break
+        return ''.join(parts)[:limit]
+
+    def _read_epub_texts(
+        self,
+        epub: zipfile.ZipFile,
+        info_by_path: Dict[str, zipfile.ZipInfo],
+        full_paths: List[str]
+    ) -> List[Optional[str]]:
+        """并行读取 EPUB 内各内容文件并转为纯文本，读取失败的位置为 None"""
+        # ZipFile 读取时对底层文件加锁定位，多线程共用同一个对象是安全的，
+        # 中央目录只解析一次；解压在锁外进行
+
+        def read_one(full_path: str) -> Optional[str]:
+            try:
+                html_content = epub.read(info_by_path[full_path]).decode('utf-8')
+                return self._html_to_text(html_content)
+            except (KeyError, UnicodeDecodeError) as e:
+                logger.warning(f"无法读取 EPUB 内容 {full_path}: {e}")
+                return None
+
+        if not full_paths:
+            return []
+
+        with ThreadPoolExecutor(max_workers=min(EPUB_PARSE_WORKERS, len(full_paths))) as executor:
+            return list(executor.map(read_one, full_paths))
 
     def parse_pdf(self, filename: str, content: bytes) -> ParsedNovel:
         """解析 PDF 文件"""
@@ -295,10 +481,9 @@ class NovelParser:
                 raise ImportError("需要安装 pypdf 或 PyPDF2 库来解析 PDF 文件: pip install pypdf")
 
         title = Path(filename).stem
-        text_parts = []
 
         try:
-            pdf_reader = pypdf.PdfReader(io.BytesIO(content))
+            pdf_reader = pypdf.PdfReader(_open_binary(content))
 
             # 尝试获取元数据
             if pdf_reader.metadata:
@@ -306,36 +491,75 @@ class NovelParser:
                     title = pdf_reader.metadata.title
                 # author 等其他元数据也可以提取
 
-            # 提取所有页面的文本
-            for page in pdf_reader.pages:
-                text = page.extract_text()
-                if text:
-                    text_parts.append(text)
+            # 逐页提取文本，单页损坏时跳过而不是放弃整本
+            full_text = '\n'.join(self._iter_pdf_pages(pdf_reader))
 
         except Exception as e:
             raise ValueError(f"PDF 解析失败: {e}")
 
-        full_text = '\n'.join(text_parts)
-
         return self._parse_text_content(title, full_text)
 
+    def _iter_pdf_pages(self, pdf_reader):
+        """逐页产出非空文本（页面共用同一个底层流，不能多线程并发提取）"""
+        for index, page in enumerate(pdf_reader.pages):
+            try:
+                text = page.extract_text()
+            except Exception as e:
+                logger.warning(f"跳过无法解析的 PDF 第 {index + 1} 页: {e}")
+                continue
+            if text:
+                yield text
+
     def _html_to_text(self, html: str) -> str:
-        """将 HTML 转换为纯文本"""
+        """将 HTML 转换为纯文本（整个文档，包括 <head> 中的 <title>）"""
+        from lxml import etree
+        from lxml import html as lxml_html
+
+        # libxml2 会丢弃 </html> 之后的内容，这类文档交给 BeautifulSoup 整体提取
+        close = html.lower().rfind('</html')
+        if close >= 0 and html[html.find('>', close) + 1:].strip():
+            return self._html_to_text_fallback(html)
+
+        try:
+            doc = lxml_html.document_fromstring(html.encode('utf-8'), parser=_get_html_parser())
+        except etree.ParserError:
+            # 空文档
+            return ''
+
+        # 获取文本（每个文本节点单独成行，跳过 script / style 和注释）
+        text = '\n'.join(self._iter_text_nodes(doc))
+        return self._clean_lines(text)
+
+    def _html_to_text_fallback(self, html: str) -> str:
+        """用 BeautifulSoup 提取整个文档的文本（lxml 无法完整保留时使用）"""
+        from bs4 import BeautifulSoup
+
         soup = BeautifulSoup(html, 'html.parser')
 
         # 移除 script 和 style
         for tag in soup(['script', 'style']):
             tag.decompose()
 
-        # 获取文本
-        text = soup.get_text(separator='\n')
+        return self._clean_lines(soup.get_text(separator='\n'))
 
-        # 清理多余空白
+    @staticmethod
+    def _clean_lines(text: str) -> str:
+        """清理多余空白：去掉每行首尾空白和空行"""
         lines = [line.strip() for line in text.split('\n')]
         lines = [line for line in lines if line]
 
         return '\n'.join(lines)
 
+    def _iter_text_nodes(self, element):
+        """按文档顺序产出元素内的文本节点"""
+        if element.text:
+            yield element.text
+        for child in element:
+            if isinstance(child.tag, str) and child.tag not in _SKIP_TEXT_TAGS:
+                yield from self._iter_text_nodes(child)
+            if child.tail:
+                yield child.tail
+
     def _parse_text_content(self, title: str, text: str) -> ParsedNovel:
         """从纯文本解析章节结构"""
         # 清理文本
@@ -360,51 +584,59 @@ class NovelParser:
 
     def _split_chapters(self, text: str) -> List[ParsedChapter]:
         """分割章节"""
+        return self._split_chapters_across([text])
+
+    def _split_chapters_across(self, texts: List[str]) -> List[ParsedChapter]:
+        """
+        按顺序分割多段文本中的章节，章节可以跨段延续
+
+        结果等价于把各段以空行连接后整体分割，但不拼接全文。
+        在每段上一次扫描出候选标题行，确认为标题后按位置切出正文，普通内容行不逐行处理
+        """
         chapters = []
-        lines = text.split('\n')
 
-        current_chapter_name = None
-        current_title = ""
-        current_content = []
+        def add_chapter(chapter_name: str, title: str, parts: List[str]) -> None:
+            # 纯空白行按空行处理
+            content_text = _BLANK_LINE_RE.sub('', '\n\n'.join(parts)).strip()
+            if content_text:
+                chapters.append(ParsedChapter(
+                    chapter_name=chapter_name,
+                    title=title,
+                    content=content_text
+                ))
 
-        for line in lines:
-            line_stripped = line.strip()
-            if not line_stripped:
-                if current_content:
-                    current_content.append("")
-                continue
+        current = None  # (章节名, 标题, 正文片段列表)
+
+        for text in texts:
+            body_start = 0  # 当前章节在本段中的正文起始位置
+
+            for candidate in _CHAPTER_CANDIDATE_RE.finditer(text):
+                line_start = candidate.start()
+                line_end = text.find('\n', line_start)
+                if line_end == -1:
+                    line_end = len(text)
 
-            # 检查是否是章节标题
-            chapter_match = self._match_chapter_title(line_stripped)
+                # 检查是否是章节标题
+                chapter_match = self._match_chapter_title(text[line_start:line_end].strip())
+                if not chapter_match:
+                    continue
 
-            if chapter_match:
                 # 保存之前的章节
-                if current_chapter_name is not None and current_content:
-                    content_text = '\n'.join(current_content).strip()
-                    if content_text:
-                        chapters.append(ParsedChapter(
-                            chapter_name=current_chapter_name,
-                            title=current_title,
-                            content=content_text
-                        ))
+                if current is not None:
+                    current[2].append(text[body_start:line_start])
+                    add_chapter(*current)
 
                 # 开始新章节
-                current_chapter_name = chapter_match['chapter_name']
-                current_title = chapter_match.get('title', '')
-                current_content = []
-            else:
-                # 普通内容行
-                current_content.append(line)
+                current = (chapter_match['chapter_name'], chapter_match.get('title', ''), [])
+                body_start = line_end + 1
+
+            # 本段剩余内容属于当前章节（第一个标题之前的内容丢弃）
+            if current is not None:
+                current[2].append(text[body_start:])
 
         # 保存最后一章
-        if current_chapter_name is not None and current_content:
-            content_text = '\n'.join(current_content).strip()
-            if content_text:
-                chapters.append(ParsedChapter(
-                    chapter_name=current_chapter_name,
-                    title=current_title,
-                    content=content_text
-                ))
+        if current is not None:
+            add_chapter(*current)
 
         return chapters
 
@@ -414,63 +646,113 @@ class NovelParser:
         if len(line) > 50:
             return None
 
-        for pattern in self.chapter_patterns:
-            match = pattern.match(line)
-            if match:
-                groups = match.groups()
-
-                # 提取章节名和标题
-                if '第' in line and '章' in line:
-                    # 提取 "第X章" 部分
-                    ch_match = re.match(r'(第[零一二三四五六七八九十百千万〇\d]+章)', line)
-                    if ch_match:
-                        chapter_name = ch_match.group(1)
-                        title = line[ch_match.end():].strip()
-                        # 移除标题前的标点
-                        title = re.sub(r'^[：:.\s]+', '', title)
-                        return {'chapter_name': chapter_name, 'title': title}
-
-                # 序章、楔子等特殊章节
-                if groups and groups[0] in ['序章', '序', '楔子', '引子', '尾声', '番外', '后记']:
-                    return {
-                        'chapter_name': groups[0],
-                        'title': groups[1] if len(groups) > 1 else ''
-                    }
-
-                # 纯数字章节
-                if re.match(r'^\d+[、.．。]', line):
-                    num_match = re.match(r'^(\d+)[、.．。]\s*(.*)', line)
-                    if num_match:
-                        return {
-                            'chapter_name': f"第{num_match.group(1)}章",
-                            'title': num_match.group(2)
-                        }
-
-                # Chapter X 格式
-                if line.lower().startswith('chapter'):
-                    ch_match = re.match(r'Chapter\s*(\d+)\s*[：:.]?\s*(.*)', line, re.IGNORECASE)
-                    if ch_match:
-                        return {
-                            'chapter_name': f"第{ch_match.group(1)}章",
-                            'title': ch_match.group(2)
-                        }
-
-                # 通用匹配
-                if groups:
-                    return {
-                        'chapter_name': line.split()[0] if line.split() else line,
-                        'title': groups[-1] if groups[-1] else ''
-                    }
+        match = self._MASTER_RE.match(line)
+        if not match:
+            return None
+
+        start, count = self._PATTERN_GROUPS[match.lastindex]
+        groups = match.groups()[start:start + count]
+
+        # 提取章节名和标题
+        if '第' in line and '章' in line:
+            # 提取 "第X章" 部分
+            ch_match = _CN_CHAPTER_NAME_RE.match(line)
+            if ch_match:
+                chapter_name = ch_match.group(1)
+                title = line[ch_match.end():].strip()
+                # 移除标题前的标点
+                title = title.lstrip(_TITLE_STRIP_CHARS)
+                return {'chapter_name': chapter_name, 'title': title}
+
+        # 序章、楔子等特殊章节
+        if groups and groups[0] in _SPECIAL_CHAPTERS:
+            return {
+                'chapter_name': groups[0],
+                'title': groups[1] if len(groups) > 1 else ''
+            }
+
+        # 纯数字章节
+        num_match = _NUM_CHAPTER_RE.match(line)
+        if num_match:
+            return {
+                'chapter_name': f"第{num_match.group(1)}章",
+                'title': num_match.group(2)
+            }
+
+        # Chapter X 格式
+        if line.lower().startswith('chapter'):
+            ch_match = _EN_CHAPTER_RE.match(line)
+            if ch_match:
+                return {
+                    'chapter_name': f"第{ch_match.group(1)}章",
+                    'title': ch_match.group(2)
+                }
+
+        # 通用匹配
+        if groups:
+            return {
+                'chapter_name': line.split()[0] if line.split() else line,
+                'title': groups[-1] if groups[-1] else ''
+            }
+
+        return None
+
 
+def _extract_json_block(text: str, open_ch: str, close_ch: str) -> Optional[str]:
+    """
+    单遍扫描取出第一个括号配平的 JSON 片段（跳过字符串里的括号），没有则返回 None
+    线性时间，不依赖回溯正则
+    """
+    start = text.find(open_ch)
+    if start < 0:
         return None
 
+    depth = 0
+    in_string = False
+    escaped = False
+    for i in range(start, len(text)):
+        ch = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == '\\':
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch == open_ch:
+            depth += 1
+        elif ch == close_ch:
+            depth -= 1
+            if depth == 0:
+                return text[start:i + 1]
+    return None
+
+
+def _extract_json_array(text: str) -> Optional[str]:
+    """取出文本中的 JSON 数组"""
+    return _extract_json_block(text, '[', ']')
+
+
+def _extract_json_object(text: str) -> Optional[str]:
+    """取出文本中的 JSON 对象"""
+    return _extract_json_block(text, '{', '}')
+
 
 class NovelAnalyzer:
     """小说分析器 - 使用 AI 分析世界观和文风"""
 
     def __init__(self):
-        from app.llm import get_client
-        self.llm = get_client()
+        self._llm = None
+
+    @property
+    def llm(self):
+        """LLM 客户端（首次分析时才加载）"""
+        if self._llm is None:
+            from app.llm import get_client
+            self._llm = get_client()
+        return self._llm
 
     async def analyze(self, novel: ParsedNovel, sample_chapters: int = 3) -> AnalysisResult:
         """
@@ -504,15 +786,22 @@ class NovelAnalyzer:
 
     def _prepare_sample_content(self, novel: ParsedNovel, sample_chapters: int) -> str:
         """准备用于分析的样本内容"""
-        # 取前几章作为样本
-        sample_texts = []
-
-        for i, chapter in enumerate(novel.chapters[:sample_chapters]):
+        # 取前几章作为样本，逐段写入同一个缓冲区，不为每章拼中间字符串
+        buf = io.StringIO()
+        sep = ""
+
+        for chapter in novel.chapters[:sample_chapters]:
+            buf.write(sep)
+            buf.write("【")
+            buf.write(chapter.chapter_name)
+            buf.write(" ")
+            buf.write(chapter.title)
+            buf.write("】\n")
             # 每章最多取3000字
-            content = chapter.content[:3000]
-            sample_texts.append(f"【{chapter.chapter_name} {chapter.title}】\n{content}")
+            buf.write(chapter.content[:3000])
+            sep = "\n\n---\n\n"
 
-        return "\n\n---\n\n".join(sample_texts)
+        return buf.getvalue()
 
     async def _analyze_world_settings(self, content: str) -> List[Dict[str, str]]:
         """分析世界观设定"""
@@ -543,9 +832,9 @@ class NovelAnalyzer:
             # 提取 JSON
             import json
             # 尝试找到 JSON 数组
-            match = re.search(r'\[[\s\S]*\]', result_text)
-            if match:
-                return json.loads(match.group())
+            block = _extract_json_array(result_text)
+            if block:
+                return json.loads(block)
             return []
         except Exception as e:
             logger.error(f"世界观分析失败: {e}")
@@ -580,9 +869,9 @@ class NovelAnalyzer:
             result_text = response.get("content", "[]")
 
             import json
-            match = re.search(r'\[[\s\S]*\]', result_text)
-            if match:
-                return json.loads(match.group())
+            block = _extract_json_array(result_text)
+            if block:
+                return json.loads(block)
             return []
         except Exception as e:
             logger.error(f"角色分析失败: {e}")
@@ -620,9 +909,9 @@ class NovelAnalyzer:
             result_text = response.get("content", "{}")
 
             import json
-            match = re.search(r'\{[\s\S]*\}', result_text)
-            if match:
-                return json.loads(match.group())
+            block = _extract_json_object(result_text)
+            if block:
+                return json.loads(block)
             return {}
         except Exception as e:
             logger.error(f"文风分析失败: {e}")
@@ -654,7 +943,7 @@ class ImportService:
 
         Args:
             filename: 文件名
-            content: 文件内容
+            content: 文件内容（bytes 或只读 mmap）
             project_name: 项目名（可选，默认使用文件名）
             analyze: 是否进行 AI 分析
 
@@ -701,6 +990,12 @@ class ImportService:
         }
 
 
+_import_service: Optional[ImportService] = None
+
+
 def get_import_service() -> ImportService:
-    """获取导入服务实例"""
-    return ImportService()
+    """获取全局导入服务实例"""
+    global _import_service
+    if _import_service is None:
+        _import_service = ImportService()
+    return _import_service
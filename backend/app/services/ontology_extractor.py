@@ -3,206 +3,84 @@
 从章节内容自动提取结构化信息更新到本体
 """
 
+import asyncio
+import hashlib
+import json
 import logging
-from typing import List, Dict, Any, Optional
+import re
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple
 
+from app.llm.cache import FileBackend, ResponseCache
 from app.llm.client import get_client
 from app.storage.ontology import OntologyStorage
 from app.models.ontology import (
+    StoryOntology,
+    CharacterNode,
+    Relationship,
     CharacterStatus,
     RelationType,
+    WorldRule,
+    Location,
+    Faction,
+    TimelineEvent,
     EventType
 )
-from app.utils.helpers import split_content_by_paragraphs
+from app.utils.helpers import generate_id, split_content_by_paragraphs
 
 logger = logging.getLogger(__name__)
 
-
-class OntologyExtractor:
-    """本体提取器"""
-
-    def __init__(self, storage: OntologyStorage = None):
-        self.storage = storage or OntologyStorage()
-        self.llm = get_client()
-
-    async def extract_and_update(
-        self,
-        project_id: str,
-        chapter: str,
-        content: str,
-        characters: List[str] = None
-    ) -> Dict[str, Any]:
-        """
-        从章节内容提取本体信息并更新
-
-        Args:
-            project_id: 项目ID
-            chapter: 章节标识
-            content: 章节内容
-            characters: 已知出场角色
-
-        Returns:
-            提取结果统计
-        """
-        # 分段处理长文本
-        chunks = split_content_by_paragraphs(content, chunk_size=4000, overlap=300)
-
-        stats = {
-            "characters_added": 0,
-            "characters_updated": 0,
-            "relationships_added": 0,
-            "events_added": 0,
-            "rules_added": 0,
-            "locations_added": 0,
-            "factions_added": 0
-        }
-
-        for i, chunk in enumerate(chunks):
-            chunk_info = f"（第 {i + 1}/{len(chunks)} 部分）" if len(chunks) > 1 else ""
-
-            # 提取本体信息
-            extraction = await self._extract_from_chunk(
-                chunk=chunk,
-                chapter=chapter,
-                chunk_info=chunk_info,
-                known_characters=characters
-            )
-
-            # 更新角色
-            for char_data in extraction.get("characters", []):
-                try:
-                    existing = await self.storage.get_ontology(project_id)
-                    if char_data["name"] in existing.characters.nodes:
-                        await self.storage.update_character_status(
-                            project_id=project_id,
-                            name=char_data["name"],
-                            status=self._parse_status(char_data.get("status")),
-                            location=char_data.get("location"),
-                            goal=char_data.get("goal"),
-                            chapter=chapter
-                        )
-                        stats["characters_updated"] += 1
-                    else:
-                        await self.storage.add_character_node(
-                            project_id=project_id,
-                            name=char_data["name"],
-                            status=self._parse_status(char_data.get("status")),
-                            location=char_data.get("location", ""),
-                            goal=char_data.get("goal", ""),
-                            aliases=char_data.get("aliases", []),
-                            groups=char_data.get("groups", []),
-                            chapter=chapter
-                        )
-                        stats["characters_added"] += 1
-                except Exception as e:
-                    logger.warning(f"更新角色失败 {char_data.get('name')}: {e}")
-
-            # 更新关系
-            for rel_data in extraction.get("relationships", []):
-                try:
-                    await self.storage.add_relationship(
-                        project_id=project_id,
-                        source=rel_data["source"],
-                        target=rel_data["target"],
-                        relation_type=self._parse_relation_type(rel_data.get("type")),
-                        description=rel_data.get("description", ""),
-                        bidirectional=rel_data.get("bidirectional", False),
-                        chapter=chapter
-                    )
-                    stats["relationships_added"] += 1
-                except Exception as e:
-                    logger.warning(f"添加关系失败: {e}")
-
-            # 更新时间线事件
-            for event_data in extraction.get("events", []):
-                try:
-                    await self.storage.add_timeline_event(
-                        project_id=project_id,
-                        time=event_data.get("time", ""),
-                        event=event_data["event"],
-                        event_type=self._parse_event_type(event_data.get("type")),
-                        participants=event_data.get("participants", []),
-                        location=event_data.get("location", ""),
-                        source_chapter=chapter,
-                        importance=event_data.get("importance", "normal"),
-                        consequences=event_data.get("consequences", [])
-                    )
-                    stats["events_added"] += 1
-                except Exception as e:
-                    logger.warning(f"添加事件失败: {e}")
-
-            # 更新世界规则
-            for rule_data in extraction.get("rules", []):
-                try:
-                    await self.storage.add_world_rule(
-                        project_id=project_id,
-                        rule=rule_data["rule"],
-                        category=rule_data.get("category", "general"),
-                        immutable=rule_data.get("immutable", False),
-                        source=chapter
-                    )
-                    stats["rules_added"] += 1
-                except Exception as e:
-                    logger.warning(f"添加规则失败: {e}")
-
-            # 更新地点
-            for loc_data in extraction.get("locations", []):
-                try:
-                    await self.storage.add_location(
-                        project_id=project_id,
-                        name=loc_data["name"],
-                        description=loc_data.get("description", ""),
-                        parent=loc_data.get("parent", "")
-                    )
-                    stats["locations_added"] += 1
-                except Exception as e:
-                    logger.warning(f"添加地点失败: {e}")
-
-            # 更新势力
-            for faction_data in extraction.get("factions", []):
-                try:
-                    await self.storage.add_faction(
-                        project_id=project_id,
-                        name=faction_data["name"],
-                        description=faction_data.get("description", ""),
-                        leader=faction_data.get("leader", ""),
-                        members=faction_data.get("members", []),
-                        allies=faction_data.get("allies", []),
-                        enemies=faction_data.get("enemies", [])
-                    )
-                    stats["factions_added"] += 1
-                except Exception as e:
-                    logger.warning(f"添加势力失败: {e}")
-
-        # 更新本体最后更新章节
-        ontology = await self.storage.get_ontology(project_id)
-        ontology.last_updated_chapter = chapter
-        await self.storage.save_ontology(project_id, ontology)
-
-        logger.info(f"本体提取完成: {stats}")
-        return stats
-
-    async def _extract_from_chunk(
-        self,
-        chunk: str,
-        chapter: str,
-        chunk_info: str = "",
-        known_characters: List[str] = None
-    ) -> Dict[str, Any]:
-        """从文本块提取本体信息"""
-
-        known_chars_hint = ""
-        if known_characters:
-            known_chars_hint = f"\n已知出场角色：{', '.join(known_characters)}"
-
-        prompt = f"""从以下章节内容中提取结构化的故事本体信息：
-
-章节：{chapter}{chunk_info}
-{known_chars_hint}
-
-{chunk}
-
-## 提取要求
+# 提取结果缓存的版本号，提示词或输出结构变化时递增，使旧条目失效
+EXTRACTION_CACHE_VERSION = 2
+
+# 连续空白（含换行）
+_WHITESPACE_RE = re.compile(r'\s+')
+# 去掉空白后不足这么多字的分块不送 LLM（如分段切出的零碎结尾、分隔线）
+MIN_CANDIDATE_CHARS = 100
+
+# LLM 响应中的 JSON 代码块，以及残留的代码块开头标记
+_JSON_FENCE_RE = re.compile(r'```(?:json)?\s*([\s\S]*?)\s*```')
+_FENCE_PREFIX_RE = re.compile(r'^```\w*\n?')
+
+# LLM 输出值 -> 枚举（模块级常量，不在每次解析时重建）
+_STATUS_MAP = {
+    "alive": CharacterStatus.ALIVE,
+    "dead": CharacterStatus.DEAD,
+    "missing": CharacterStatus.MISSING,
+    "unknown": CharacterStatus.UNKNOWN
+}
+
+_RELATION_MAP = {
+    "parent": RelationType.PARENT,
+    "child": RelationType.CHILD,
+    "sibling": RelationType.SIBLING,
+    "spouse": RelationType.SPOUSE,
+    "friend": RelationType.FRIEND,
+    "enemy": RelationType.ENEMY,
+    "rival": RelationType.RIVAL,
+    "ally": RelationType.ALLY,
+    "mentor": RelationType.MENTOR,
+    "student": RelationType.STUDENT,
+    "colleague": RelationType.COLLEAGUE,
+    "subordinate": RelationType.SUBORDINATE,
+    "superior": RelationType.SUPERIOR,
+    "lover": RelationType.LOVER,
+    "ex_lover": RelationType.EX_LOVER,
+    "crush": RelationType.CRUSH,
+    "admirer": RelationType.ADMIRER,
+    "acquaintance": RelationType.ACQUAINTANCE,
+    "family": RelationType.PARENT,  # 简化处理
+}
+
+_EVENT_MAP = {
+    "plot": EventType.PLOT,
+    "character": EventType.CHARACTER,
+    "world": EventType.WORLD,
+    "relationship": EventType.RELATIONSHIP
+}
+
+# 提取提示词中与分块无关的部分（单块、批量提取共用）
+_EXTRACTION_REQUIREMENTS = """## 提取要求
 
 请提取以下类型的信息（只提取明确出现的，不要推测）：
 
@@ -231,33 +109,30 @@ class OntologyExtractor:
 
 ### 6. 势力/组织（如有新出现）
 - 组织名称和描述
-- 领导者、成员
-
-## 输出格式（JSON）
+- 领导者、成员"""
 
-```json
-{{
+_EXTRACTION_SCHEMA = """{
   "characters": [
-    {{
+    {
       "name": "角色名",
       "status": "alive/dead/missing/unknown",
       "location": "当前位置",
       "goal": "当前目标",
       "aliases": ["别名1"],
       "groups": ["所属组织"]
-    }}
+    }
   ],
   "relationships": [
-    {{
+    {
       "source": "角色A",
       "target": "角色B",
       "type": "friend/enemy/lover/family/mentor/ally/rival/other",
       "description": "关系描述",
       "bidirectional": true
-    }}
+    }
   ],
   "events": [
-    {{
+    {
       "time": "故事时间",
       "event": "事件描述",
       "type": "plot/character/world/relationship",
@@ -265,134 +140,516 @@ class OntologyExtractor:
       "location": "地点",
       "importance": "critical/normal/minor",
       "consequences": ["后果1"]
-    }}
+    }
   ],
   "rules": [
-    {{
+    {
       "rule": "规则描述",
       "category": "magic/technology/social/physical/general",
       "immutable": true
-    }}
+    }
   ],
   "locations": [
-    {{
+    {
       "name": "地点名",
       "description": "描述",
       "parent": "上级地点"
-    }}
+    }
   ],
   "factions": [
-    {{
+    {
       "name": "组织名",
       "description": "描述",
       "leader": "领导者",
       "members": ["成员"],
       "allies": ["盟友组织"],
       "enemies": ["敌对组织"]
-    }}
+    }
   ]
-}}
-```
+}"""
 
-注意：
+_EXTRACTION_NOTES = """注意：
 - 只返回 JSON，不要其他内容
 - 没有相关信息的字段可以返回空数组
 - 角色关系类型参考：parent/child/sibling/spouse/friend/enemy/rival/ally/mentor/student/colleague/subordinate/superior/lover/ex_lover/crush/admirer/acquaintance/other
 - 重要性分级：critical（核心转折）、normal（一般重要）、minor（细节）"""
 
+# 完整提示词的固定前缀（指令、输出格式在前，章节内容拼在末尾），
+# 每个请求的开头完全相同，便于提供商的提示词前缀缓存命中
+_EXTRACT_PROMPT_HEAD = f"""从本提示末尾给出的章节内容中提取结构化的故事本体信息。
+
+{_EXTRACTION_REQUIREMENTS}
+
+## 输出格式（JSON）
+
+```json
+{_EXTRACTION_SCHEMA}
+```
+
+{_EXTRACTION_NOTES}
+
+## 章节内容
+"""
+
+_EXTRACT_BATCH_PROMPT_HEAD = f"""本提示末尾给出同一章节的多个文本块，请分别从每个文本块中提取结构化的故事本体信息。
+
+{_EXTRACTION_REQUIREMENTS}
+
+## 输出格式（JSON）
+
+每个文本块对应 blocks 中的一个对象，顺序与文本块一致：
+
+```json
+{{
+  "blocks": [
+    {{...第 1 块的提取结果...}},
+    {{...第 2 块的提取结果...}}
+  ]
+}}
+```
+
+每个对象的结构：
+
+```json
+{_EXTRACTION_SCHEMA}
+```
+
+{_EXTRACTION_NOTES}
+- blocks 的长度必须等于文本块数，某块没有信息时给出各字段为空数组的对象
+
+## 章节内容
+"""
+
+# 单块提取失败时的空结果
+_EMPTY_EXTRACTION = {
+    "characters": [],
+    "relationships": [],
+    "events": [],
+    "rules": [],
+    "locations": [],
+    "factions": []
+}
+
+
+def _chunk_is_candidate(chunk: str) -> bool:
+    """本地预判分块是否值得提取：太短或没有任何文字（只有标点、分隔符）的分块直接跳过"""
+    text = _WHITESPACE_RE.sub("", chunk)
+    return len(text) >= MIN_CANDIDATE_CHARS and any(ch.isalpha() for ch in text)
+
+
+class OntologyExtractor:
+    """本体提取器"""
+
+    # 同一章节并发提取请求的上限（各提供商另有 max_concurrent 限制）
+    MAX_CONCURRENT_CHUNKS = 8
+
+    # 合并为一次请求的分块总字数上限，超出则逐块提取，避免输出被 max_tokens 截断
+    MAX_BATCH_CHARS = 8000
+
+    def __init__(self, storage: OntologyStorage = None, batch_size: int = 4, cache_dir: Path = None):
+        self.storage = storage or OntologyStorage()
+        self.llm = get_client()
+        # 每次请求最多合并的分块数（另受 MAX_BATCH_CHARS 限制），1 表示逐块提取
+        self.batch_size = max(1, batch_size)
+
+        # 按规范化后的分块文本缓存解析成功的提取结果：只改了空白、换行的分块也能命中
+        # 默认放在项目数据目录下（data/cache/ontology_extract/）
+        cache_dir = Path(cache_dir) if cache_dir else self.storage.data_dir / "cache" / "ontology_extract"
+        self.extraction_cache = ResponseCache(backend=FileBackend(cache_dir))
+
+    async def extract_and_update(
+        self,
+        project_id: str,
+        chapter: str,
+        content: str,
+        characters: List[str] = None
+    ) -> Dict[str, Any]:
+        """
+        从章节内容提取本体信息并更新
+
+        Args:
+            project_id: 项目ID
+            chapter: 章节标识
+            content: 章节内容
+            characters: 已知出场角色
+
+        Returns:
+            提取结果统计
+        """
+        # 分段处理长文本
+        chunks = split_content_by_paragraphs(content, chunk_size=4000, overlap=300)
+
+        stats = {
+            "characters_added": 0,
+            "characters_updated": 0,
+            "relationships_added": 0,
+            "events_added": 0,
+            "rules_added": 0,
+            "locations_added": 0,
+            "factions_added": 0
+        }
+
+        semaphore = asyncio.Semaphore(self.MAX_CONCURRENT_CHUNKS)
+
+        async def extract_group(start: int, end: int) -> List[Dict[str, Any]]:
+            async with semaphore:
+                return await self._extract_from_chunks(
+                    chunks=chunks[start:end],
+                    chapter=chapter,
+                    first_index=start,
+                    total=len(chunks),
+                    known_characters=characters
+                )
+
+        # 相邻分块按字数预算打包合并为一次请求；各组互不依赖，并发进行，
+        # 写入本体仍按分块顺序串行
+        groups = await asyncio.gather(
+            *(extract_group(start, end) for start, end in self._pack_chunks(chunks))
+        )
+        extractions = [extraction for group in groups for extraction in group]
+
+        # 所有更新在同一个本体对象上进行，最后只写回一次
+        async with self.storage.mutate_ontology(project_id) as ontology:
+            for extraction in extractions:
+                self._apply_extraction(ontology, extraction, chapter, stats)
+            # 更新本体最后更新章节
+            ontology.last_updated_chapter = chapter
+
+        logger.info(f"本体提取完成: {stats}")
+        return stats
+
+    def _extraction_key(self, chunk: str, known_characters: List[str] = None) -> str:
+        """提取结果缓存键：规范化文本 + 已知角色 + 当前模型"""
+        provider = self.llm.default_provider
+        llm = self.llm.providers.get(provider)
+        payload = json.dumps(
+            {
+                "version": EXTRACTION_CACHE_VERSION,
+                "provider": provider,
+                "model": llm.model if llm else "",
+                "chunk": _WHITESPACE_RE.sub(" ", chunk).strip(),
+                "characters": sorted(known_characters or []),
+            },
+            ensure_ascii=False,
+            sort_keys=True
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _apply_extraction(
+        self,
+        ontology: StoryOntology,
+        extraction: Dict[str, Any],
+        chapter: str,
+        stats: Dict[str, int]
+    ) -> None:
+        """把一个分块的提取结果写入本体对象（不落盘），并累计统计"""
+        graph = ontology.characters
+
+        # 更新角色
+        for char_data in extraction.get("characters", []):
+            try:
+                node = graph.get_node(char_data["name"])
+                if node is not None:
+                    node.status = self._parse_status(char_data.get("status"))
+                    if char_data.get("location") is not None:
+                        node.current_location = char_data["location"]
+                    if char_data.get("goal") is not None:
+                        node.current_goal = char_data["goal"]
+                    if chapter:
+                        node.last_updated_chapter = chapter
+                    graph.touch()
+                    stats["characters_updated"] += 1
+                else:
+                    graph.add_character(CharacterNode(
+                        name=char_data["name"],
+                        status=self._parse_status(char_data.get("status")),
+                        current_location=char_data.get("location") or "",
+                        current_goal=char_data.get("goal") or "",
+                        aliases=char_data.get("aliases") or [],
+                        groups=char_data.get("groups") or [],
+                        last_updated_chapter=chapter
+                    ))
+                    stats["characters_added"] += 1
+            except Exception as e:
+                logger.warning(f"更新角色失败 {char_data.get('name')}: {e}")
+
+        # 更新关系
+        for rel_data in extraction.get("relationships", []):
+            try:
+                graph.add_relationship(Relationship(
+                    source=rel_data["source"],
+                    target=rel_data["target"],
+                    relation_type=self._parse_relation_type(rel_data.get("type")),
+                    description=rel_data.get("description", ""),
+                    bidirectional=rel_data.get("bidirectional", False),
+                    established_at=chapter
+                ))
+                stats["relationships_added"] += 1
+            except Exception as e:
+                logger.warning(f"添加关系失败: {e}")
+
+        # 更新时间线事件
+        for event_data in extraction.get("events", []):
+            try:
+                time = event_data.get("time", "")
+                ontology.timeline.add_event(TimelineEvent(
+                    id=generate_id("E"),
+                    time=time,
+                    event=event_data["event"],
+                    event_type=self._parse_event_type(event_data.get("type")),
+                    participants=event_data.get("participants") or [],
+                    location=event_data.get("location", ""),
+                    source_chapter=chapter,
+                    importance=event_data.get("importance", "normal"),
+                    consequences=event_data.get("consequences") or []
+                ))
+                # 更新当前时间
+                if time:
+                    ontology.timeline.current_time = time
+                stats["events_added"] += 1
+            except Exception as e:
+                logger.warning(f"添加事件失败: {e}")
+
+        # 更新世界规则
+        for rule_data in extraction.get("rules", []):
+            try:
+                ontology.world.add_rule(WorldRule(
+                    id=generate_id("R"),
+                    rule=rule_data["rule"],
+                    category=rule_data.get("category", "general"),
+                    immutable=rule_data.get("immutable", False),
+                    source=chapter
+                ))
+                stats["rules_added"] += 1
+            except Exception as e:
+                logger.warning(f"添加规则失败: {e}")
+
+        # 更新地点
+        for loc_data in extraction.get("locations", []):
+            try:
+                ontology.world.locations[loc_data["name"]] = Location(
+                    name=loc_data["name"],
+                    description=loc_data.get("description", ""),
+                    parent=loc_data.get("parent", "")
+                )
+                stats["locations_added"] += 1
+            except Exception as e:
+                logger.warning(f"添加地点失败: {e}")
+
+        # 更新势力
+        for faction_data in extraction.get("factions", []):
+            try:
+                ontology.world.factions[faction_data["name"]] = Faction(
+                    name=faction_data["name"],
+                    description=faction_data.get("description", ""),
+                    leader=faction_data.get("leader", ""),
+                    members=faction_data.get("members") or [],
+                    allies=faction_data.get("allies") or [],
+                    enemies=faction_data.get("enemies") or []
+                )
+                stats["factions_added"] += 1
+            except Exception as e:
+                logger.warning(f"添加势力失败: {e}")
+
+    def _pack_chunks(self, chunks: List[str]) -> List[Tuple[int, int]]:
+        """
+        把相邻分块打包成 (起, 止) 区间：每组不超过 batch_size 块、总字数不超过 MAX_BATCH_CHARS
+
+        按固定块数分组时，接近 chunk_size 的分块几组就会超出字数上限而退回逐块请求
+        """
+        groups = []
+        start = 0
+        size = 0
+        for i, chunk in enumerate(chunks):
+            if i > start and (i - start >= self.batch_size or size + len(chunk) > self.MAX_BATCH_CHARS):
+                groups.append((start, i))
+                start, size = i, 0
+            size += len(chunk)
+        if chunks:
+            groups.append((start, len(chunks)))
+        return groups
+
+    async def _extract_from_chunks(
+        self,
+        chunks: List[str],
+        chapter: str,
+        first_index: int,
+        total: int,
+        known_characters: List[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        批量提取多个分块，结果与 chunks 一一对应
+
+        本地预判无可提取内容的分块不发请求，已缓存的分块直接复用；其余分块合并为一次请求，
+        超出字数上限或返回的块数对不上时退回逐块提取
+        """
+        def chunk_info(i: int) -> str:
+            return f"（第 {first_index + i + 1}/{total} 部分）" if total > 1 else ""
+
+        keys = [self._extraction_key(chunk, known_characters) for chunk in chunks]
+        results: List[Optional[Dict[str, Any]]] = []
+        for chunk, key in zip(chunks, keys):
+            if not _chunk_is_candidate(chunk):
+                results.append({field: [] for field in _EMPTY_EXTRACTION})
+            else:
+                results.append(await self.extraction_cache.get(key))
+        pending = [i for i, result in enumerate(results) if result is None]
+
+        if len(pending) > 1 and sum(len(chunks[i]) for i in pending) <= self.MAX_BATCH_CHARS:
+            blocks = await self._request_batch(
+                [chunks[i] for i in pending],
+                [chunk_info(i) for i in pending],
+                chapter,
+                known_characters
+            )
+            if blocks is not None:
+                for i, block in zip(pending, blocks):
+                    results[i] = block
+                    await self.extraction_cache.set(keys[i], block)
+                pending = []
+
+        if pending:
+            extracted = await asyncio.gather(*(
+                self._extract_from_chunk(
+                    chunk=chunks[i],
+                    chapter=chapter,
+                    chunk_info=chunk_info(i),
+                    known_characters=known_characters
+                )
+                for i in pending
+            ))
+            for i, extraction in zip(pending, extracted):
+                results[i] = extraction
+
+        return results
+
+    async def _request_batch(
+        self,
+        chunks: List[str],
+        chunk_infos: List[str],
+        chapter: str,
+        known_characters: List[str] = None
+    ) -> Optional[List[Dict[str, Any]]]:
+        """一次请求提取多个分块，失败或块数不符返回 None"""
+        known_chars_hint = ""
+        if known_characters:
+            known_chars_hint = f"\n已知出场角色：{', '.join(known_characters)}"
+
+        sections = "\n\n".join(
+            f"## 第 {n} 块{info}\n\n{chunk}"
+            for n, (chunk, info) in enumerate(zip(chunks, chunk_infos), start=1)
+        )
+
+        # 固定指令在前、章节内容在后，提供商的前缀缓存可以跨请求复用
+        prompt = _EXTRACT_BATCH_PROMPT_HEAD + f"""
+章节：{chapter}（共 {len(chunks)} 块）
+{known_chars_hint}
+
+{sections}"""
+
         try:
             result = await self.llm.chat([
                 {"role": "user", "content": prompt}
             ], temperature=0.3)
 
-            response_text = result.get("content", "")
+            blocks = self._parse_json_response(result.get("content", "")).get("blocks")
+            if isinstance(blocks, list) and len(blocks) == len(chunks) \
+                    and all(isinstance(block, dict) for block in blocks):
+                return blocks
+            logger.warning("批量提取返回的块数不符，改为逐块提取")
+        except Exception as e:
+            logger.warning(f"批量提取失败，改为逐块提取: {e}")
+        return None
 
-            # 提取 JSON
-            import json
-            import re
+    async def _extract_from_chunk(
+        self,
+        chunk: str,
+        chapter: str,
+        chunk_info: str = "",
+        known_characters: List[str] = None
+    ) -> Dict[str, Any]:
+        """从文本块提取本体信息"""
+        cache_key = self._extraction_key(chunk, known_characters)
+        cached = await self.extraction_cache.get(cache_key)
+        if cached is not None:
+            logger.debug(f"本体提取缓存命中: {cache_key[:12]}")
+            return cached
 
-            # 尝试从代码块中提取
-            json_match = re.search(r'```(?:json)?\s*([\s\S]*?)\s*```', response_text)
-            if json_match:
-                json_str = json_match.group(1)
-            else:
-                # 尝试直接解析整个响应
-                json_str = response_text
+        known_chars_hint = ""
+        if known_characters:
+            known_chars_hint = f"\n已知出场角色：{', '.join(known_characters)}"
+
+        prompt = _EXTRACT_PROMPT_HEAD + f"""
+章节：{chapter}{chunk_info}
+{known_chars_hint}
+
+{chunk}"""
 
-            # 清理可能的前后缀
-            json_str = json_str.strip()
-            if json_str.startswith("```"):
-                json_str = re.sub(r'^```\w*\n?', '', json_str)
-            if json_str.endswith("```"):
-                json_str = json_str[:-3]
+        try:
+            # 不缓存原始响应：格式错误的回复存进去后每次都会被重放，该分块就再也无法重试
+            result = await self.llm.chat([
+                {"role": "user", "content": prompt}
+            ], temperature=0.3)
 
-            extraction = json.loads(json_str)
+            extraction = self._parse_json_response(result.get("content", ""))
+            if not isinstance(extraction, dict):
+                raise ValueError(f"提取结果不是 JSON 对象: {type(extraction).__name__}")
+            # 只缓存解析成功的结果
+            await self.extraction_cache.set(cache_key, extraction)
             return extraction
 
         except Exception as e:
             logger.error(f"本体提取失败: {e}")
-            return {
-                "characters": [],
-                "relationships": [],
-                "events": [],
-                "rules": [],
-                "locations": [],
-                "factions": []
-            }
-
-    def _parse_status(self, status: Optional[str]) -> CharacterStatus:
+            return {key: [] for key in _EMPTY_EXTRACTION}
+
+    @staticmethod
+    def _parse_json_response(response_text: str) -> Dict[str, Any]:
+        """从 LLM 响应中解析 JSON（兼容代码块包裹）"""
+        response_text = response_text.strip()
+        # 模型直接返回 JSON 时无需再找代码块
+        if response_text[:1] in ('{', '['):
+            try:
+                return json.loads(response_text)
+            except json.JSONDecodeError:
+                pass
+
+        # 尝试从代码块中提取
+        json_match = _JSON_FENCE_RE.search(response_text)
+        if json_match:
+            json_str = json_match.group(1)
+        else:
+            # 尝试直接解析整个响应
+            json_str = response_text
+
+        # 清理可能的前后缀
+        json_str = json_str.strip()
+        if json_str.startswith("```"):
+            json_str = _FENCE_PREFIX_RE.sub('', json_str)
+        if json_str.endswith("```"):
+            json_str = json_str[:-3]
+
+        return json.loads(json_str)
+
+    @staticmethod
+    def _parse_status(status: Optional[str]) -> CharacterStatus:
         """解析角色状态"""
         if not status:
             return CharacterStatus.ALIVE
+        return _STATUS_MAP.get(status.lower(), CharacterStatus.ALIVE)
 
-        status_map = {
-            "alive": CharacterStatus.ALIVE,
-            "dead": CharacterStatus.DEAD,
-            "missing": CharacterStatus.MISSING,
-            "unknown": CharacterStatus.UNKNOWN
-        }
-        return status_map.get(status.lower(), CharacterStatus.ALIVE)
-
-    def _parse_relation_type(self, rel_type: Optional[str]) -> RelationType:
+    @staticmethod
+    def _parse_relation_type(rel_type: Optional[str]) -> RelationType:
         """解析关系类型"""
         if not rel_type:
             return RelationType.OTHER
+        return _RELATION_MAP.get(rel_type.lower(), RelationType.OTHER)
 
-        type_map = {
-            "parent": RelationType.PARENT,
-            "child": RelationType.CHILD,
-            "sibling": RelationType.SIBLING,
-            "spouse": RelationType.SPOUSE,
-            "friend": RelationType.FRIEND,
-            "enemy": RelationType.ENEMY,
-            "rival": RelationType.RIVAL,
-            "ally": RelationType.ALLY,
-            "mentor": RelationType.MENTOR,
-            "student": RelationType.STUDENT,
-            "colleague": RelationType.COLLEAGUE,
-            "subordinate": RelationType.SUBORDINATE,
-            "superior": RelationType.SUPERIOR,
-            "lover": RelationType.LOVER,
-            "ex_lover": RelationType.EX_LOVER,
-            "crush": RelationType.CRUSH,
-            "admirer": RelationType.ADMIRER,
-            "acquaintance": RelationType.ACQUAINTANCE,
-            "family": RelationType.PARENT,  # 简化处理
-        }
-        return type_map.get(rel_type.lower(), RelationType.OTHER)
-
-    def _parse_event_type(self, event_type: Optional[str]) -> EventType:
+    @staticmethod
+    def _parse_event_type(event_type: Optional[str]) -> EventType:
         """解析事件类型"""
         if not event_type:
             return EventType.PLOT
-
-        type_map = {
-            "plot": EventType.PLOT,
-            "character": EventType.CHARACTER,
-            "world": EventType.WORLD,
-            "relationship": EventType.RELATIONSHIP
-        }
-        return type_map.get(event_type.lower(), EventType.PLOT)
+        return _EVENT_MAP.get(event_type.lower(), EventType.PLOT)
 
 
 # 全局实例
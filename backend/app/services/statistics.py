@@ -3,11 +3,15 @@
 提供项目写作统计数据：字数趋势、章节进度、创作时间分析
 """
 
+import asyncio
 import os
+import weakref
+from bisect import bisect_left
+from itertools import accumulate
 from pathlib import Path
 from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional
-from dataclasses import dataclass, asdict
+from typing import List, Dict, Any, Optional, Tuple
+from dataclasses import dataclass
 from collections import defaultdict
 
 from app.storage import ProjectStorage, DraftStorage
@@ -55,17 +59,49 @@ class ProjectStats:
 class StatisticsService:
     """统计服务"""
 
+    # 统计时并发读取章节的上限
+    MAX_CONCURRENT_READS = 16
+
+    # 统计结果缓存的最大项目数
+    MAX_CACHED_PROJECTS = 8
+
     def __init__(self, data_dir: str = "../data"):
         self.projects = ProjectStorage(data_dir)
         self.drafts = DraftStorage(data_dir)
         self.data_dir = Path(data_dir)
+        # project_id -> ((项目名, 草稿目录指纹), 统计结果)
+        self._stats_cache: Dict[str, Tuple[tuple, ProjectStats]] = {}
+        # 弱引用：锁只在有请求持有或等待时存在，不随项目数累积
+        self._stats_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
 
     async def get_project_stats(self, project_id: str) -> ProjectStats:
-        """获取项目统计数据"""
+        """
+        获取项目统计数据（草稿目录未变化时复用上次的结果）
+
+        概览、趋势、进度等接口都基于它，同一页面的多次请求只扫描一次
+        """
         project = await self.projects.get_project(project_id)
         if not project:
             raise ValueError(f"项目不存在: {project_id}")
 
+        lock = self._stats_locks.setdefault(project_id, asyncio.Lock())
+        # 同一项目的并发请求只统计一次
+        async with lock:
+            key = (project.name, self.drafts.fingerprint(project_id))
+            cached = self._stats_cache.get(project_id)
+            if cached is not None and cached[0] == key:
+                return cached[1]
+
+            stats = await self._compute_project_stats(project_id, project.name)
+
+            self._stats_cache.pop(project_id, None)
+            if len(self._stats_cache) >= self.MAX_CACHED_PROJECTS:
+                self._stats_cache.pop(next(iter(self._stats_cache)))
+            self._stats_cache[project_id] = (key, stats)
+            return stats
+
+    async def _compute_project_stats(self, project_id: str, project_name: str) -> ProjectStats:
+        """扫描所有章节计算统计数据"""
         chapters = await self.drafts.list_chapters(project_id)
 
         chapter_stats_list = []
@@ -80,14 +116,27 @@ class StatisticsService:
         completed_chapters = 0
         all_dates = []
 
-        for chapter in chapters:
-            # 获取版本列表
-            versions = await self.drafts.list_versions(project_id, chapter)
+        semaphore = asyncio.Semaphore(self.MAX_CONCURRENT_READS)
+
+        async def load_chapter(chapter: str):
+            async with semaphore:
+                versions = await self.drafts.list_versions(project_id, chapter)
+                # 各版本只需要时间，stat 即可；正文只读成稿，没有成稿时再读最新草稿
+                times = self.drafts.get_version_times(project_id, chapter, versions)
+                final_content = await self.drafts.get_final(project_id, chapter)
+                latest = None
+                if final_content is None and versions:
+                    latest = await self.drafts.get_draft(project_id, chapter, versions[-1])
+                return versions, times, final_content, latest
+
+        loaded = await asyncio.gather(*(load_chapter(chapter) for chapter in chapters))
+
+        # 汇总按章节顺序串行进行
+        for chapter, (versions, times, final_content, latest) in zip(chapters, loaded):
             version_count = len(versions)
             total_versions += version_count
 
             # 检查是否有成稿
-            final_content = await self.drafts.get_final(project_id, chapter)
             has_final = final_content is not None
 
             if has_final:
@@ -96,8 +145,7 @@ class StatisticsService:
                 status = "final"
             else:
                 # 使用最新草稿
-                draft = await self.drafts.get_latest_draft(project_id, chapter)
-                word_count = draft.word_count if draft else 0
+                word_count = latest.word_count if latest else 0
                 status = "draft"
 
             total_words += word_count
@@ -107,11 +155,10 @@ class StatisticsService:
             updated_at = None
 
             # 遍历所有版本获取时间信息
-            for version in versions:
-                draft = await self.drafts.get_draft(project_id, chapter, version)
-                if draft and draft.created_at:
-                    date_str = draft.created_at.strftime("%Y-%m-%d")
-                    all_dates.append(draft.created_at)
+            for version, created in zip(versions, times):
+                if created:
+                    date_str = created.strftime("%Y-%m-%d")
+                    all_dates.append(created)
 
                     # 记录每日统计
                     if version == versions[0]:  # 第一个版本
@@ -120,10 +167,10 @@ class StatisticsService:
 
                     # 更新创建时间（取最早）
                     if created_at is None:
-                        created_at = draft.created_at.isoformat()
+                        created_at = created.isoformat()
 
                     # 更新时间（取最新）
-                    updated_at = draft.created_at.isoformat()
+                    updated_at = created.isoformat()
 
             # 计算该章节对当天字数的贡献
             if updated_at:
@@ -160,15 +207,16 @@ class StatisticsService:
 
         return ProjectStats(
             project_id=project_id,
-            project_name=project.name,
+            project_name=project_name,
             total_words=total_words,
             total_chapters=len(chapters),
             completed_chapters=completed_chapters,
             draft_chapters=len(chapters) - completed_chapters,
             total_versions=total_versions,
             avg_words_per_chapter=avg_words,
-            chapters=[asdict(cs) for cs in chapter_stats_list],
-            daily_stats=[asdict(ds) for ds in daily_stats],
+            # 字段都是标量，浅拷贝实例字典即可，不需要 asdict 的递归深拷贝
+            chapters=[dict(vars(cs)) for cs in chapter_stats_list],
+            daily_stats=[dict(vars(ds)) for ds in daily_stats],
             writing_days=writing_days,
             first_created=first_created,
             last_updated=last_updated
@@ -190,20 +238,18 @@ class StatisticsService:
         end_date = datetime.now().date()
         start_date = end_date - timedelta(days=days - 1)
 
-        # 创建日期到字数的映射
-        date_words = {}
-        for ds in stats.daily_stats:
-            date_words[ds["date"]] = ds["word_count"]
+        # daily_stats 已按日期升序：日期列表 + 字数前缀和
+        dates = [ds["date"] for ds in stats.daily_stats]
+        prefix = list(accumulate(ds["word_count"] for ds in stats.daily_stats))
+        date_words = dict(zip(dates, (ds["word_count"] for ds in stats.daily_stats)))
 
         # 计算累计字数
         trend = []
-        cumulative = 0
         current_date = start_date
 
-        # 先计算 start_date 之前的累计字数
-        for ds in stats.daily_stats:
-            if ds["date"] < start_date.strftime("%Y-%m-%d"):
-                cumulative += ds["word_count"]
+        # start_date 之前的累计字数：二分定位后直接取前缀和
+        idx = bisect_left(dates, start_date.strftime("%Y-%m-%d"))
+        cumulative = prefix[idx - 1] if idx > 0 else 0
 
         while current_date <= end_date:
             date_str = current_date.strftime("%Y-%m-%d")
@@ -0,0 +1,81 @@
+"""
+章节排序键
+事实表、草稿等按章节排序时共用，同一章节名只解析一次
+"""
+
+import re
+from functools import lru_cache
+
+# 中文数字映射
+_CN_NUM_MAP = {
+    '零': 0, '〇': 0, '一': 1, '二': 2, '三': 3, '四': 4, '五': 5,
+    '六': 6, '七': 7, '八': 8, '九': 9, '十': 10,
+    '百': 100, '千': 1000, '万': 10000
+}
+
+# 各种章节命名格式（按匹配优先级）
+_CN_CHAPTER_RE = re.compile(r'第([零〇一二三四五六七八九十百千万]+)章')
+_NUM_CHAPTER_RE = re.compile(r'第(\d+)章')
+_CH_RE = re.compile(r'ch(\d+)', re.IGNORECASE)
+_EN_CHAPTER_RE = re.compile(r'chapter\s*(\d+)', re.IGNORECASE)
+_LEADING_NUM_RE = re.compile(r'(\d+)')
+
+# 特殊章节（序章、楔子等）的先后顺序
+_SPECIAL_ORDER = (('序章', 0), ('楔子', 1), ('引子', 2), ('序言', 3), ('前言', 4))
+
+
+def _cn_to_num(cn_str: str) -> int:
+    """将中文数字转换为阿拉伯数字"""
+    if not cn_str:
+        return 0
+    result = 0
+    temp = 0
+    for char in cn_str:
+        if char in _CN_NUM_MAP:
+            val = _CN_NUM_MAP[char]
+            if val >= 10:
+                if temp == 0:
+                    temp = 1
+                result += temp * val
+                temp = 0
+            else:
+                temp = temp * 10 + val
+    result += temp
+    return result if result > 0 else -1
+
+
+@lru_cache(maxsize=4096)
+def chapter_sort_key(chapter: str) -> tuple:
+    """生成章节排序键，支持多种章节命名格式"""
+    # 1. 匹配 "第X章" 格式（中文数字）
+    match = _CN_CHAPTER_RE.match(chapter)
+    if match:
+        return (2, _cn_to_num(match.group(1)), chapter)
+
+    # 2. 匹配 "第X章" 格式（阿拉伯数字）
+    match = _NUM_CHAPTER_RE.match(chapter)
+    if match:
+        return (2, int(match.group(1)), chapter)
+
+    # 3. 匹配 "chX" 格式
+    match = _CH_RE.match(chapter)
+    if match:
+        return (2, int(match.group(1)), chapter)
+
+    # 4. 匹配 "Chapter X" 格式
+    match = _EN_CHAPTER_RE.match(chapter)
+    if match:
+        return (2, int(match.group(1)), chapter)
+
+    # 5. 匹配纯数字开头
+    match = _LEADING_NUM_RE.match(chapter)
+    if match:
+        return (2, int(match.group(1)), chapter)
+
+    # 6. 特殊章节（序章、楔子等）排最前面
+    for key, order in _SPECIAL_ORDER:
+        if key in chapter:
+            return (1, order, chapter)
+
+    # 7. 其他按字母顺序
+    return (3, 0, chapter)
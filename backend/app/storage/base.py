@@ -5,8 +5,12 @@
 
 import json
 import logging
+import os
+import pickle
+import uuid
+from collections import OrderedDict
 from pathlib import Path
-from typing import Any, List, Optional, TypeVar, Type
+from typing import Any, Dict, List, Optional, Tuple, TypeVar, Type
 
 import yaml
 import aiofiles
@@ -15,34 +19,124 @@ from app.utils.exceptions import StorageError
 
 logger = logging.getLogger(__name__)
 
+# 优先使用 libyaml 的 C 实现（与 safe_load / dump 语义一致），未编译 libyaml 时退回纯 Python 实现
+try:
+    from yaml import CSafeLoader as _YamlLoader, CDumper as _YamlDumper
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader, Dumper as _YamlDumper
+
 T = TypeVar('T')
 
+# JSONL 编解码器：json.dumps 带非默认参数时每次调用都会新建 JSONEncoder，这里只建一次
+_json_encode = json.JSONEncoder(ensure_ascii=False).encode
+_json_decode = json.JSONDecoder().decode
+
+# 文件内容缓存：路径 -> (文件标识, 数据, 是否 pickle)，所有存储实例共享
+# 本进程的写入会使条目失效，外部修改由 (inode, 修改时间, 大小) 发现；
+# 解析出的 dict/list 存 pickle，每次返回独立副本，调用方修改返回值不会污染缓存；
+# 文本是不可变的 str，直接存放
+PARSED_CACHE_SIZE = 128
+_parsed_cache: "OrderedDict[Path, Tuple[tuple, Any, bool]]" = OrderedDict()
+_MISS = object()
+
 
 class BaseStorage:
     """基础存储类"""
 
+    # 不超过这个大小的 JSONL 一次读入再按行解析，更大的文件分块读取
+    JSONL_READ_ALL_BYTES = 10 * 1024 * 1024
+    # 大 JSONL 分块读取的块大小
+    JSONL_CHUNK_BYTES = 1024 * 1024
+    # 项目目录 Path 缓存的条目上限，超出后整体清空
+    PROJECT_DIR_CACHE_SIZE = 256
+
     def __init__(self, data_dir: str):
         self.data_dir = Path(data_dir).resolve()
         self.data_dir.mkdir(parents=True, exist_ok=True)
+        # (project_id, 子目录名) -> Path，每次存取都要拼路径，同一项目只拼一次
+        self._project_dirs: Dict[Tuple[str, str], Path] = {}
 
-    def _get_project_dir(self, project_id: str) -> Path:
-        """获取项目目录"""
-        return self.data_dir / project_id
+    def _get_project_dir(self, project_id: str, subdir: str = "") -> Path:
+        """获取项目目录（指定 subdir 时为项目下的子目录，如 "drafts"、"canon"）"""
+        key = (project_id, subdir)
+        path = self._project_dirs.get(key)
+        if path is None:
+            if len(self._project_dirs) >= self.PROJECT_DIR_CACHE_SIZE:
+                self._project_dirs.clear()
+            path = self.data_dir / project_id
+            if subdir:
+                path = path / subdir
+            self._project_dirs[key] = path
+        return path
 
     def _ensure_dir(self, path: Path) -> None:
         """确保目录存在"""
         path.mkdir(parents=True, exist_ok=True)
 
+    # ========== 解析缓存 ==========
+
+    @staticmethod
+    def _file_key(path: Path) -> Optional[tuple]:
+        """文件标识，文件不存在返回 None（须在读取内容之前取，避免把新内容记到旧标识下）"""
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    @staticmethod
+    def _cache_get(path: Path, file_key: tuple) -> Any:
+        entry = _parsed_cache.get(path)
+        if entry is None or entry[0] != file_key:
+            return _MISS
+        _parsed_cache.move_to_end(path)
+        _, data, pickled = entry
+        return pickle.loads(data) if pickled else data
+
+    @staticmethod
+    def _cache_put(path: Path, file_key: tuple, value: Any, copy: bool = True) -> None:
+        """copy=False 只用于不可变的值（如 str）"""
+        if copy:
+            _parsed_cache[path] = (file_key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), True)
+        else:
+            _parsed_cache[path] = (file_key, value, False)
+        _parsed_cache.move_to_end(path)
+        if len(_parsed_cache) > PARSED_CACHE_SIZE:
+            _parsed_cache.popitem(last=False)
+
+    @staticmethod
+    def invalidate(path: Path) -> None:
+        """使某个文件的解析缓存失效"""
+        _parsed_cache.pop(path, None)
+
+    async def _write_atomic(self, path: Path, content: str) -> None:
+        """先完整写入同目录临时文件再替换，写到一半出错也不会留下残缺的目标文件"""
+        # 临时文件名带随机后缀，同一文件的并发写入互不干扰
+        tmp_path = path.with_name(f"{path.name}.{uuid.uuid4().hex[:8]}.tmp")
+        try:
+            async with aiofiles.open(tmp_path, 'w', encoding='utf-8') as f:
+                await f.write(content)
+            os.replace(tmp_path, path)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+
     # ========== YAML 操作 ==========
 
     async def read_yaml(self, path: Path) -> Optional[dict]:
         """读取 YAML 文件"""
-        if not path.exists():
+        file_key = self._file_key(path)
+        if file_key is None:
             return None
+        cached = self._cache_get(path, file_key)
+        if cached is not _MISS:
+            return cached
         try:
             async with aiofiles.open(path, 'r', encoding='utf-8') as f:
                 content = await f.read()
-                return yaml.safe_load(content)
+            data = yaml.load(content, Loader=_YamlLoader)
+            self._cache_put(path, file_key, data)
+            return data
         except Exception as e:
             logger.error(f"读取 YAML 失败: {path}, {e}")
             raise StorageError(f"读取失败: {path}", str(path))
@@ -51,61 +145,110 @@ class BaseStorage:
         """写入 YAML 文件"""
         self._ensure_dir(path.parent)
         try:
-            async with aiofiles.open(path, 'w', encoding='utf-8') as f:
-                content = yaml.dump(data, allow_unicode=True, sort_keys=False)
-                await f.write(content)
+            content = yaml.dump(data, Dumper=_YamlDumper, allow_unicode=True, sort_keys=False)
+            await self._write_atomic(path, content)
         except Exception as e:
             logger.error(f"写入 YAML 失败: {path}, {e}")
             raise StorageError(f"写入失败: {path}", str(path))
+        finally:
+            # 写入过程中被读到的半成品也一并失效
+            self.invalidate(path)
 
     # ========== JSONL 操作 ==========
 
     async def read_jsonl(self, path: Path) -> List[dict]:
         """读取 JSONL 文件（每行一个 JSON）"""
-        if not path.exists():
+        file_key = self._file_key(path)
+        if file_key is None:
             return []
+        cached = self._cache_get(path, file_key)
+        if cached is not _MISS:
+            return cached
         try:
-            items = []
-            async with aiofiles.open(path, 'r', encoding='utf-8') as f:
-                async for line in f:
-                    line = line.strip()
-                    if line:
-                        items.append(json.loads(line))
+            if file_key[2] <= self.JSONL_READ_ALL_BYTES:
+                async with aiofiles.open(path, 'r', encoding='utf-8') as f:
+                    content = await f.read()
+                # 只按 \n 切分：str.splitlines 还会在 U+2028 等字符处断行，而它们可能出现在 JSON 字符串里
+                items = [_json_decode(line) for line in content.split('\n') if line.strip()]
+            else:
+                items = await self._read_jsonl_chunked(path)
+            self._cache_put(path, file_key, items)
             return items
         except Exception as e:
             logger.error(f"读取 JSONL 失败: {path}, {e}")
             raise StorageError(f"读取失败: {path}", str(path))
 
+    async def _read_jsonl_chunked(self, path: Path) -> List[dict]:
+        """按块读取二进制内容，在缓冲区里按 b'\\n' 切行解析（比逐行 readline 少一层逐字符扫描）"""
+        items = []
+        buf = bytearray()
+        async with aiofiles.open(path, 'rb') as f:
+            while True:
+                chunk = await f.read(self.JSONL_CHUNK_BYTES)
+                if not chunk:
+                    break
+                buf += chunk
+                end = buf.rfind(b'\n')
+                if end < 0:
+                    continue
+                # 只解析完整的行，末尾不完整的部分留到下一块
+                for line in bytes(buf[:end]).split(b'\n'):
+                    if line.strip():
+                        items.append(json.loads(line))
+                del buf[:end + 1]
+        if buf.strip():
+            items.append(json.loads(bytes(buf)))
+        return items
+
     async def append_jsonl(self, path: Path, item: dict) -> None:
         """追加一行到 JSONL 文件"""
+        await self.append_jsonl_many(path, [item])
+
+    async def append_jsonl_many(self, path: Path, items: List[dict]) -> None:
+        """追加多行到 JSONL 文件，只打开一次、一次写入"""
+        if not items:
+            return
         self._ensure_dir(path.parent)
         try:
+            content = ''.join(_json_encode(item) + '\n' for item in items)
             async with aiofiles.open(path, 'a', encoding='utf-8') as f:
-                await f.write(json.dumps(item, ensure_ascii=False) + '\n')
+                await f.write(content)
         except Exception as e:
             logger.error(f"追加 JSONL 失败: {path}, {e}")
             raise StorageError(f"写入失败: {path}", str(path))
+        finally:
+            # 写入过程中被读到的半成品也一并失效
+            self.invalidate(path)
 
     async def write_jsonl(self, path: Path, items: List[dict]) -> None:
         """覆盖写入 JSONL 文件"""
         self._ensure_dir(path.parent)
         try:
-            async with aiofiles.open(path, 'w', encoding='utf-8') as f:
-                for item in items:
-                    await f.write(json.dumps(item, ensure_ascii=False) + '\n')
+            # 整个文件拼好后一次写入
+            content = ''.join(_json_encode(item) + '\n' for item in items)
+            await self._write_atomic(path, content)
         except Exception as e:
             logger.error(f"写入 JSONL 失败: {path}, {e}")
             raise StorageError(f"写入失败: {path}", str(path))
+        finally:
+            # 写入过程中被读到的半成品也一并失效
+            self.invalidate(path)
 
     # ========== Markdown/Text 操作 ==========
 
     async def read_text(self, path: Path) -> Optional[str]:
         """读取文本文件"""
-        if not path.exists():
+        file_key = self._file_key(path)
+        if file_key is None:
             return None
+        cached = self._cache_get(path, file_key)
+        if cached is not _MISS:
+            return cached
         try:
             async with aiofiles.open(path, 'r', encoding='utf-8') as f:
-                return await f.read()
+                content = await f.read()
+            self._cache_put(path, file_key, content, copy=False)
+            return content
         except Exception as e:
             logger.error(f"读取文本失败: {path}, {e}")
             raise StorageError(f"读取失败: {path}", str(path))
@@ -114,11 +257,12 @@ class BaseStorage:
         """写入文本文件"""
         self._ensure_dir(path.parent)
         try:
-            async with aiofiles.open(path, 'w', encoding='utf-8') as f:
-                await f.write(content)
+            await self._write_atomic(path, content)
         except Exception as e:
             logger.error(f"写入文本失败: {path}, {e}")
             raise StorageError(f"写入失败: {path}", str(path))
+        finally:
+            self.invalidate(path)
 
     # ========== 通用操作 ==========
 
@@ -128,13 +272,42 @@ class BaseStorage:
 
     async def delete(self, path: Path) -> bool:
         """删除文件"""
-        if path.exists():
+        self.invalidate(path)
+        try:
             path.unlink()
-            return True
-        return False
+        except FileNotFoundError:
+            return False
+        return True
 
     async def list_dir(self, path: Path) -> List[str]:
         """列出目录内容"""
-        if not path.exists():
+        try:
+            with os.scandir(path) as it:
+                return [entry.name for entry in it]
+        except FileNotFoundError:
             return []
-        return [p.name for p in path.iterdir()]
+
+    @staticmethod
+    def _scan_names(path: Path, suffix: str = "", dirs: bool = False) -> List[str]:
+        """
+        用 os.scandir 列出目录下的文件名（dirs=True 时列子目录），目录不存在返回空列表
+
+        指定 suffix 时只取该后缀的文件并去掉后缀；
+        DirEntry 自带类型信息，不用为每个条目构造 Path 再单独 stat
+        """
+        names = []
+        try:
+            with os.scandir(path) as it:
+                for entry in it:
+                    if dirs:
+                        if entry.is_dir():
+                            names.append(entry.name)
+                    elif suffix:
+                        name = entry.name
+                        if name.endswith(suffix) and entry.is_file():
+                            names.append(name[:-len(suffix)])
+                    elif entry.is_file():
+                        names.append(entry.name)
+        except FileNotFoundError:
+            pass
+        return names
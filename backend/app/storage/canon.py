@@ -2,17 +2,42 @@
 事实表存储：事实、时间线、角色状态
 """
 
+import asyncio
+import heapq
 import re
-from typing import List, Optional, Callable
+from collections import deque
+from functools import lru_cache
+from itertools import islice
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Callable, Tuple
 
 from app.models.canon import Fact, TimelineEvent, CharacterState
+from app.models._adapters import FACT_LIST, TIMELINE_LIST, STATE_LIST
 from app.storage.base import BaseStorage
+from app.storage._chapter_key import chapter_sort_key
 from app.utils.helpers import generate_id
 
 
+@lru_cache(maxsize=64)
+def _character_matchers(characters: Tuple[str, ...]) -> Tuple[frozenset, frozenset, "re.Pattern"]:
+    """
+    出场角色的匹配工具：(角色名集合, 小写角色名集合, 角色名正则)
+
+    写作/审稿时事实和时间线用同一份角色列表各筛一次，按角色元组缓存，只构造一次
+    """
+    # 一次正则扫描代替逐个角色名的子串查找
+    names_re = re.compile("|".join(map(re.escape, characters)))
+    return frozenset(characters), frozenset(c.lower() for c in characters), names_re
+
+
 class CanonStorage(BaseStorage):
     """事实表存储"""
 
+    # facts.jsonl 是追加日志：同一 id 以最后一条为准，带删除标记的条目表示已删除；
+    # 日志条数超过有效事实数的这个倍数时整体重写一次（压缩）
+    FACTS_COMPACT_RATIO = 2
+    FACT_TOMBSTONE = "_deleted"
+
     def __init__(self, data_dir: str = None):
         """初始化事实表存储，如果没有指定 data_dir 则使用配置中的默认值"""
         if data_dir is None:
@@ -20,80 +45,100 @@ class CanonStorage(BaseStorage):
             config = get_config()
             data_dir = str(config.data_dir)
         super().__init__(data_dir)
+        # (文件路径, 索引名) -> (文件标识, 索引)，文件变化后按需重建
+        self._indexes: Dict[Tuple[Path, str], Tuple[tuple, Dict[str, dict]]] = {}
 
-    # ========== 章节排序工具 ==========
-
-    def _chapter_sort_key(self, chapter: str) -> tuple:
-        """生成章节排序键，与 DraftStorage 保持一致"""
-        cn_num_map = {
-            '零': 0, '〇': 0, '一': 1, '二': 2, '三': 3, '四': 4, '五': 5,
-            '六': 6, '七': 7, '八': 8, '九': 9, '十': 10,
-            '百': 100, '千': 1000, '万': 10000
-        }
+    async def _get_index(
+        self,
+        path: Path,
+        name: str,
+        build: Callable[[List[dict]], Dict[str, dict]]
+    ) -> Dict[str, dict]:
+        """获取 JSONL 文件上的查找索引（键 -> 原始条目），文件未变时直接复用"""
+        file_key = self._file_key(path)
+        if file_key is None:
+            return {}
+        entry = self._indexes.get((path, name))
+        if entry is not None and entry[0] == file_key:
+            return entry[1]
+        # 先取文件标识再读内容：读取期间文件若被改写，下次查询时标识对不上会重建
+        index = build(await self.read_jsonl(path))
+        self._indexes[(path, name)] = (file_key, index)
+        return index
+
+    def _index_in_chapter_order(
+        self,
+        items: List[dict],
+        key_field: str,
+        chapter_field: str,
+        last: bool = False
+    ) -> Dict[str, dict]:
+        """按章节顺序（同章节保持文件顺序）为每个键取第一条或最后一条"""
+        ordered = self._sort_by_chapter(items, lambda item: item.get(chapter_field, ""))
+        index: Dict[str, dict] = {}
+        for item in ordered:
+            key = item.get(key_field)
+            if last or key not in index:
+                index[key] = item
+        return index
 
-        def cn_to_num(cn_str: str) -> int:
-            if not cn_str:
-                return 0
-            result = 0
-            temp = 0
-            for char in cn_str:
-                if char in cn_num_map:
-                    val = cn_num_map[char]
-                    if val >= 10:
-                        if temp == 0:
-                            temp = 1
-                        result += temp * val
-                        temp = 0
-                    else:
-                        temp = temp * 10 + val
-            result += temp
-            return result if result > 0 else -1
-
-        # 1. 匹配 "第X章" 格式（中文数字）
-        match = re.match(r'第([零〇一二三四五六七八九十百千万]+)章', chapter)
-        if match:
-            return (2, cn_to_num(match.group(1)), chapter)
-
-        # 2. 匹配 "第X章" 格式（阿拉伯数字）
-        match = re.match(r'第(\d+)章', chapter)
-        if match:
-            return (2, int(match.group(1)), chapter)
-
-        # 3. 匹配 "chX" 格式
-        match = re.match(r'ch(\d+)', chapter, re.IGNORECASE)
-        if match:
-            return (2, int(match.group(1)), chapter)
-
-        # 4. 匹配 "Chapter X" 格式
-        match = re.match(r'chapter\s*(\d+)', chapter, re.IGNORECASE)
-        if match:
-            return (2, int(match.group(1)), chapter)
-
-        # 5. 匹配纯数字开头
-        match = re.match(r'(\d+)', chapter)
-        if match:
-            return (2, int(match.group(1)), chapter)
-
-        # 6. 特殊章节（序章、楔子等）排最前面
-        special_order = {'序章': 0, '楔子': 1, '引子': 2, '序言': 3, '前言': 4}
-        for key, order in special_order.items():
-            if key in chapter:
-                return (1, order, chapter)
-
-        # 7. 其他按字母顺序
-        return (3, 0, chapter)
+    # ========== 章节排序工具 ==========
 
     def _sort_by_chapter(self, items: List, get_chapter: Callable) -> List:
         """按章节顺序排序"""
-        return sorted(items, key=lambda x: self._chapter_sort_key(get_chapter(x)))
+        return sorted(items, key=lambda x: chapter_sort_key(get_chapter(x)))
+
+    def _merge_by_chapter(self, *runs: List, get_chapter: Callable) -> List:
+        """
+        合并几段各自已按章节排好序的列表
+
+        与拼接后再 _sort_by_chapter 的结果完全相同（同章节时靠前的段在前），但只需线性归并
+        """
+        return list(heapq.merge(*runs, key=lambda x: chapter_sort_key(get_chapter(x))))
 
     # ========== 事实 ==========
 
+    @staticmethod
+    def _fact_matcher(characters: List[str]) -> Callable[[Fact], bool]:
+        """构造“事实是否与这些角色相关”的判断：相关角色（忽略大小写）命中或陈述中出现角色名"""
+        _, names_lower, names_re = _character_matchers(tuple(characters))
+        return lambda fact: (
+            not names_lower.isdisjoint(map(str.lower, fact.characters)) or
+            names_re.search(fact.statement) is not None
+        )
+
+    def _live_facts(self, items: List[dict]) -> List[dict]:
+        """回放事实日志：每个 id 取最后写入的版本（位置保持首次出现处），去掉已删除的"""
+        live: Dict[Any, dict] = {}
+        for i, item in enumerate(items):
+            # 没有 id 的旧数据各自独立，不互相覆盖
+            key = item.get("id") or ("", i)
+            if item.get(self.FACT_TOMBSTONE):
+                live.pop(key, None)
+            else:
+                live[key] = item
+        return list(live.values())
+
+    async def _append_fact_records(self, path: Path, items: List[dict], records: List[dict]) -> None:
+        """
+        追加事实的新版本或删除标记（items 为追加前的日志）
+
+        失效记录过多时改为写入压缩后的有效事实，日志不会无限增长
+        """
+        if not records:
+            return
+        log = items + records
+        live = self._live_facts(log)
+        if len(log) > self.FACTS_COMPACT_RATIO * len(live):
+            await self.write_jsonl(path, live)
+            return
+        await self.append_jsonl_many(path, records)
+
     async def get_facts(self, project_id: str) -> List[Fact]:
         """获取所有事实（按章节排序）"""
-        path = self._get_project_dir(project_id) / "canon" / "facts.jsonl"
-        items = await self.read_jsonl(path)
-        facts = [Fact(**item) for item in items]
+        path = self._get_project_dir(project_id, "canon") / "facts.jsonl"
+        items = self._live_facts(await self.read_jsonl(path))
+        facts = FACT_LIST.validate_python(items)
         return self._sort_by_chapter(facts, lambda f: f.source)
 
     async def get_facts_for_writing(
@@ -113,28 +158,38 @@ class CanonStorage(BaseStorage):
         """
         all_facts = await self.get_facts(project_id)
         characters = characters or []
-        characters_lower = [c.lower() for c in characters]
 
-        # 分类
+        if not characters:
+            # 没有出场角色：critical 全部 + 从末尾取最近的其他事实补足
+            result = [fact for fact in all_facts if fact.importance == "critical"]
+            remaining = limit - len(result)
+            if remaining > 0:
+                recent = reversed(all_facts)
+                tail = list(islice((f for f in recent if f.importance != "critical"), remaining))
+                result.extend(reversed(tail))
+            return result
+
+        is_related = self._fact_matcher(characters)
+
+        # 分类：除 critical 外每类最多用到 limit 条，角色相关只留最早的，其他只留最近的
+        cap = max(limit, 0)
         critical_facts = []
         character_related = []
-        other_facts = []
+        other_facts = deque(maxlen=cap)
 
         for fact in all_facts:
             # critical 重要性
             if fact.importance == "critical":
                 critical_facts.append(fact)
             # 与出场角色相关
-            elif characters and (
-                any(c.lower() in characters_lower for c in fact.characters) or
-                any(c in fact.statement for c in characters)
-            ):
-                character_related.append(fact)
+            elif is_related(fact):
+                if len(character_related) < cap:
+                    character_related.append(fact)
             else:
                 other_facts.append(fact)
 
         # 合并：critical 全部 + 角色相关 + 其他补充
-        result = critical_facts.copy()
+        result = critical_facts
         remaining = limit - len(result)
 
         if remaining > 0:
@@ -143,7 +198,7 @@ class CanonStorage(BaseStorage):
 
         if remaining > 0:
             # 其他事实取最近的
-            result.extend(other_facts[-remaining:])
+            result.extend(list(other_facts)[-remaining:])
 
         return result
 
@@ -154,73 +209,93 @@ class CanonStorage(BaseStorage):
         如果已存在相同 statement 的事实，则更新它；
         否则追加新事实。
         """
-        if not fact.id:
-            fact.id = generate_id("F")
-        path = self._get_project_dir(project_id) / "canon" / "facts.jsonl"
-        items = await self.read_jsonl(path)
+        await self.add_facts(project_id, [fact])
+        return fact
 
-        # 检查是否已存在相同 statement 的事实（忽略大小写和首尾空格）
-        fact_key = fact.statement.strip().lower()
-        found_index = -1
-        for i, item in enumerate(items):
-            existing_key = item.get("statement", "").strip().lower()
-            if existing_key == fact_key:
-                found_index = i
-                break
-
-        if found_index >= 0:
-            # 更新现有事实，保持原 ID
-            fact.id = items[found_index].get("id", fact.id)
-            items[found_index] = fact.model_dump()
-            await self.write_jsonl(path, items)
+    async def add_facts(self, project_id: str, facts: List[Fact]) -> List[Fact]:
+        """批量添加事实，去重规则与 add_fact 相同（依次处理），整批只写一次文件"""
+        path = self._get_project_dir(project_id, "canon") / "facts.jsonl"
+        items = await self.read_jsonl(path)
+        live = self._live_facts(items)
+
+        # statement（忽略大小写和首尾空格）-> live 中第一条的位置
+        by_statement: Dict[str, int] = {}
+        for i, item in enumerate(live):
+            by_statement.setdefault(item.get("statement", "").strip().lower(), i)
+
+        records = []
+        rewrite = False
+        for fact in facts:
+            if not fact.id:
+                fact.id = generate_id("F")
+            fact_key = fact.statement.strip().lower()
+            i = by_statement.get(fact_key)
+            if i is None:
+                by_statement[fact_key] = len(live)
+                live.append(fact.model_dump())
+            else:
+                if live[i].get("id"):
+                    # 更新现有事实，保持原 ID
+                    fact.id = live[i]["id"]
+                else:
+                    # 没有 id 的旧数据只能原地替换后整体重写
+                    rewrite = True
+                live[i] = fact.model_dump()
+            records.append(fact.model_dump())
+
+        if rewrite:
+            await self.write_jsonl(path, live)
         else:
-            # 追加新事实
-            await self.append_jsonl(path, fact.model_dump())
-
-        return fact
+            # 新事实和新版本都直接追加
+            await self._append_fact_records(path, items, records)
+        return facts
 
     async def update_fact(self, project_id: str, fact: Fact) -> bool:
-        """更新事实（用于修改同一章节的事实）"""
-        path = self._get_project_dir(project_id) / "canon" / "facts.jsonl"
+        """更新事实（用于修改同一章节的事实），追加新版本而不重写整个文件"""
+        path = self._get_project_dir(project_id, "canon") / "facts.jsonl"
         items = await self.read_jsonl(path)
 
-        updated = False
-        for i, item in enumerate(items):
-            if item.get("id") == fact.id:
-                items[i] = fact.model_dump()
-                updated = True
-                break
+        if not fact.id or not any(item.get("id") == fact.id for item in self._live_facts(items)):
+            return False
 
-        if updated:
-            await self.write_jsonl(path, items)
-        return updated
+        await self._append_fact_records(path, items, [fact.model_dump()])
+        return True
 
     async def remove_facts_by_source(self, project_id: str, source: str) -> int:
-        """删除指定来源章节的所有事实（用于重新提取）"""
-        path = self._get_project_dir(project_id) / "canon" / "facts.jsonl"
+        """删除指定来源章节的所有事实（用于重新提取），追加删除标记"""
+        path = self._get_project_dir(project_id, "canon") / "facts.jsonl"
         items = await self.read_jsonl(path)
 
-        original_count = len(items)
-        items = [item for item in items if item.get("source") != source]
+        live = self._live_facts(items)
+        removed = [item for item in live if item.get("source") == source]
+        if not removed:
+            return 0
 
-        await self.write_jsonl(path, items)
-        return original_count - len(items)
+        if all(item.get("id") for item in removed):
+            tombstones = [{"id": item["id"], self.FACT_TOMBSTONE: True} for item in removed]
+            await self._append_fact_records(path, items, tombstones)
+        else:
+            # 没有 id 的旧数据无法打删除标记，整体重写
+            await self.write_jsonl(path, [item for item in live if item.get("source") != source])
+        return len(removed)
 
     async def find_fact(self, project_id: str, fact_id: str) -> Optional[Fact]:
         """查找事实"""
-        facts = await self.get_facts(project_id)
-        for f in facts:
-            if f.id == fact_id:
-                return f
-        return None
+        path = self._get_project_dir(project_id, "canon") / "facts.jsonl"
+        index = await self._get_index(
+            path, "id",
+            lambda items: self._index_in_chapter_order(self._live_facts(items), "id", "source")
+        )
+        item = index.get(fact_id)
+        return Fact.model_validate(item) if item is not None else None
 
     # ========== 时间线 ==========
 
     async def get_timeline(self, project_id: str) -> List[TimelineEvent]:
         """获取所有时间线事件（按章节排序）"""
-        path = self._get_project_dir(project_id) / "canon" / "timeline.jsonl"
+        path = self._get_project_dir(project_id, "canon") / "timeline.jsonl"
         items = await self.read_jsonl(path)
-        events = [TimelineEvent(**item) for item in items]
+        events = TIMELINE_LIST.validate_python(items)
         return self._sort_by_chapter(events, lambda e: e.source)
 
     async def get_timeline_for_writing(
@@ -244,24 +319,22 @@ class CanonStorage(BaseStorage):
             return all_events[-limit:]
 
         # 筛选与角色相关的事件
+        characters_set = _character_matchers(tuple(characters))[0]
         related = []
         other = []
 
         for event in all_events:
-            if any(c in event.participants for c in characters):
+            if not characters_set.isdisjoint(event.participants):
                 related.append(event)
             else:
                 other.append(event)
 
         # 角色相关 + 其他补充
-        result = related.copy()
-        remaining = limit - len(result)
+        remaining = limit - len(related)
+        supplement = other[-remaining:] if remaining > 0 else []
 
-        if remaining > 0:
-            result.extend(other[-remaining:])
-
-        # 按章节顺序排列
-        return self._sort_by_chapter(result, lambda e: e.source)
+        # 按章节顺序排列：两段都来自已排序的 all_events，归并即可
+        return self._merge_by_chapter(related, supplement, get_chapter=lambda e: e.source)
 
     async def get_facts_for_review(
         self,
@@ -281,46 +354,62 @@ class CanonStorage(BaseStorage):
         """
         all_facts = await self.get_facts(project_id)
         characters = characters or []
-        characters_lower = [c.lower() for c in characters]
 
-        # 分类
+        if not characters:
+            # 没有出场角色：critical 全部 + 最早的 limit 条高置信度事实
+            critical_facts = [fact for fact in all_facts if fact.importance == "critical"]
+            confident = (f for f in all_facts if f.importance != "critical" and f.confidence >= 0.8)
+            return self._merge_by_chapter(
+                critical_facts, list(islice(confident, max(limit, 0))), get_chapter=lambda f: f.source
+            )
+
+        matches = self._fact_matcher(characters)
+
+        # 分类：除 critical 外每类只保留最早的 limit 条，后面的用不到
+        cap = max(limit, 0)
         critical_facts = []
         high_confidence_related = []
         other_related = []
         other_facts = []
 
         for fact in all_facts:
-            is_related = characters and (
-                any(c.lower() in characters_lower for c in fact.characters) or
-                any(c in fact.statement for c in characters)
-            )
-
             if fact.importance == "critical":
                 critical_facts.append(fact)
-            elif is_related and fact.confidence >= 0.8:
-                high_confidence_related.append(fact)
+                continue
+            if len(high_confidence_related) >= cap and len(other_related) >= cap and len(other_facts) >= cap:
+                # 其余分类都已满，只需继续收集 critical
+                continue
+
+            is_related = matches(fact)
+            if is_related and fact.confidence >= 0.8:
+                bucket = high_confidence_related
             elif is_related:
-                other_related.append(fact)
+                bucket = other_related
             elif fact.confidence >= 0.8:
-                other_facts.append(fact)
+                bucket = other_facts
+            else:
+                continue
+            if len(bucket) < cap:
+                bucket.append(fact)
 
         # 合并：critical 全部（不计入 limit）+ 高置信度相关 + 其他相关 + 其他高置信度
-        result = critical_facts.copy()
+        runs = [critical_facts]
         remaining = limit
 
         if remaining > 0:
-            result.extend(high_confidence_related[:remaining])
+            # 高置信度相关已满 limit 条时 remaining 为 0，与按全部条数计算的结果一致
+            runs.append(high_confidence_related)
             remaining = limit - len(high_confidence_related)
 
         if remaining > 0:
-            result.extend(other_related[:remaining])
+            runs.append(other_related[:remaining])
             remaining -= len(other_related[:remaining])
 
         if remaining > 0:
-            result.extend(other_facts[:remaining])
+            runs.append(other_facts[:remaining])
 
-        # 按章节顺序排序
-        return self._sort_by_chapter(result, lambda f: f.source)
+        # 按章节顺序排序：各段都来自已排序的 all_facts，归并即可
+        return self._merge_by_chapter(*runs, get_chapter=lambda f: f.source)
 
     async def get_timeline_for_review(
         self,
@@ -344,23 +433,21 @@ class CanonStorage(BaseStorage):
             return all_events[-limit:] if len(all_events) > limit else all_events
 
         # 筛选与角色相关的事件
+        characters_set = _character_matchers(tuple(characters))[0]
         related = []
         other = []
 
         for event in all_events:
-            if any(c in event.participants for c in characters):
+            if not characters_set.isdisjoint(event.participants):
                 related.append(event)
             else:
                 other.append(event)
 
         # 角色相关全部 + 其他补充
-        result = related.copy()
-        remaining = limit - len(result)
+        remaining = limit - len(related)
+        supplement = other[-remaining:] if remaining > 0 else []
 
-        if remaining > 0:
-            result.extend(other[-remaining:])
-
-        return self._sort_by_chapter(result, lambda e: e.source)
+        return self._merge_by_chapter(related, supplement, get_chapter=lambda e: e.source)
 
     async def add_timeline_event(self, project_id: str, event: TimelineEvent) -> TimelineEvent:
         """
@@ -369,36 +456,47 @@ class CanonStorage(BaseStorage):
         如果已存在相同 (time, event) 的事件，则更新它；
         否则追加新事件。
         """
-        if not event.id:
-            event.id = generate_id("T")
-        path = self._get_project_dir(project_id) / "canon" / "timeline.jsonl"
+        await self.add_timeline_events(project_id, [event])
+        return event
+
+    async def add_timeline_events(self, project_id: str, events: List[TimelineEvent]) -> List[TimelineEvent]:
+        """批量添加时间线事件，去重规则与 add_timeline_event 相同（依次处理），整批只写一次文件"""
+        path = self._get_project_dir(project_id, "canon") / "timeline.jsonl"
         items = await self.read_jsonl(path)
 
-        # 检查是否已存在相同 (time, event) 的事件（忽略大小写和首尾空格）
-        time_key = event.time.strip()
-        event_key = event.event.strip().lower()
-        found_index = -1
+        # (time, event)（忽略大小写和首尾空格）-> 第一条的位置
+        positions: Dict[Tuple[str, str], int] = {}
         for i, item in enumerate(items):
-            existing_time = item.get("time", "").strip()
-            existing_event = item.get("event", "").strip().lower()
-            if existing_time == time_key and existing_event == event_key:
-                found_index = i
-                break
-
-        if found_index >= 0:
-            # 更新现有事件，保持原 ID
-            event.id = items[found_index].get("id", event.id)
-            items[found_index] = event.model_dump()
+            key = (item.get("time", "").strip(), item.get("event", "").strip().lower())
+            positions.setdefault(key, i)
+
+        appended = []
+        replaced = False
+        for event in events:
+            if not event.id:
+                event.id = generate_id("T")
+            key = (event.time.strip(), event.event.strip().lower())
+            i = positions.get(key)
+            if i is None:
+                positions[key] = len(items)
+                items.append(event.model_dump())
+                appended.append(items[-1])
+            else:
+                # 更新现有事件，保持原 ID
+                event.id = items[i].get("id", event.id)
+                items[i] = event.model_dump()
+                replaced = True
+
+        if replaced:
             await self.write_jsonl(path, items)
         else:
-            # 追加新事件
-            await self.append_jsonl(path, event.model_dump())
-
-        return event
+            # 只有新事件时直接追加
+            await self.append_jsonl_many(path, appended)
+        return events
 
     async def remove_timeline_by_source(self, project_id: str, source: str) -> int:
         """删除指定来源章节的所有时间线事件"""
-        path = self._get_project_dir(project_id) / "canon" / "timeline.jsonl"
+        path = self._get_project_dir(project_id, "canon") / "timeline.jsonl"
         items = await self.read_jsonl(path)
 
         original_count = len(items)
@@ -411,9 +509,9 @@ class CanonStorage(BaseStorage):
 
     async def get_character_states(self, project_id: str) -> List[CharacterState]:
         """获取所有角色状态（按章节排序）"""
-        path = self._get_project_dir(project_id) / "canon" / "states.jsonl"
+        path = self._get_project_dir(project_id, "canon") / "states.jsonl"
         items = await self.read_jsonl(path)
-        states = [CharacterState(**item) for item in items]
+        states = STATE_LIST.validate_python(items)
         return self._sort_by_chapter(states, lambda s: s.chapter)
 
     async def get_latest_states(
@@ -427,26 +525,26 @@ class CanonStorage(BaseStorage):
         如果指定了 characters，只返回这些角色的状态
         否则返回所有角色的最新状态
         """
-        all_states = await self.get_character_states(project_id)
-
-        # 每个角色只保留最新的状态
-        latest: dict[str, CharacterState] = {}
-        for state in all_states:
-            latest[state.character] = state
+        # 每个角色只保留最新的状态，只为返回的条目构造模型
+        latest = await self._latest_states_index(project_id)
 
         if characters:
-            return [latest[c] for c in characters if c in latest]
+            return [CharacterState.model_validate(latest[c]) for c in characters if c in latest]
 
-        return list(latest.values())
+        return STATE_LIST.validate_python(list(latest.values()))
+
+    async def _latest_states_index(self, project_id: str) -> Dict[str, dict]:
+        """角色 -> 按章节排序后的最后一条状态（原始条目，按角色首次出现的顺序排列）"""
+        path = self._get_project_dir(project_id, "canon") / "states.jsonl"
+        return await self._get_index(
+            path, "latest",
+            lambda items: self._index_in_chapter_order(items, "character", "chapter", last=True)
+        )
 
     async def get_character_state(self, project_id: str, character: str) -> Optional[CharacterState]:
         """获取某角色的最新状态"""
-        states = await self.get_character_states(project_id)
-        # 返回该角色的最后一条状态（已按章节排序）
-        for state in reversed(states):
-            if state.character == character:
-                return state
-        return None
+        item = (await self._latest_states_index(project_id)).get(character)
+        return CharacterState.model_validate(item) if item is not None else None
 
     async def update_character_state(self, project_id: str, state: CharacterState) -> CharacterState:
         """
@@ -455,29 +553,43 @@ class CanonStorage(BaseStorage):
         如果已存在相同 (character, chapter) 的状态，则更新它；
         否则追加新状态。
         """
-        path = self._get_project_dir(project_id) / "canon" / "states.jsonl"
+        await self.update_character_states(project_id, [state])
+        return state
+
+    async def update_character_states(self, project_id: str, states: List[CharacterState]) -> List[CharacterState]:
+        """批量更新角色状态，去重规则与 update_character_state 相同（依次处理），整批只写一次文件"""
+        path = self._get_project_dir(project_id, "canon") / "states.jsonl"
         items = await self.read_jsonl(path)
 
-        # 检查是否已存在相同 (character, chapter) 的状态
-        found_index = -1
+        # (character, chapter) -> 第一条的位置
+        positions: Dict[Tuple[Any, Any], int] = {}
         for i, item in enumerate(items):
-            if item.get("character") == state.character and item.get("chapter") == state.chapter:
-                found_index = i
-                break
+            positions.setdefault((item.get("character"), item.get("chapter")), i)
+
+        appended = []
+        replaced = False
+        for state in states:
+            key = (state.character, state.chapter)
+            i = positions.get(key)
+            if i is None:
+                positions[key] = len(items)
+                items.append(state.model_dump())
+                appended.append(items[-1])
+            else:
+                # 更新现有状态
+                items[i] = state.model_dump()
+                replaced = True
 
-        if found_index >= 0:
-            # 更新现有状态
-            items[found_index] = state.model_dump()
+        if replaced:
             await self.write_jsonl(path, items)
         else:
-            # 追加新状态
-            await self.append_jsonl(path, state.model_dump())
-
-        return state
+            # 只有新状态时直接追加
+            await self.append_jsonl_many(path, appended)
+        return states
 
     async def remove_states_by_chapter(self, project_id: str, chapter: str) -> int:
         """删除指定章节的所有角色状态"""
-        path = self._get_project_dir(project_id) / "canon" / "states.jsonl"
+        path = self._get_project_dir(project_id, "canon") / "states.jsonl"
         items = await self.read_jsonl(path)
 
         original_count = len(items)
@@ -490,20 +602,21 @@ class CanonStorage(BaseStorage):
 
     async def clear_canon(self, project_id: str) -> None:
         """清空事实表（谨慎使用）"""
-        canon_dir = self._get_project_dir(project_id) / "canon"
+        canon_dir = self._get_project_dir(project_id, "canon")
         for f in ["facts.jsonl", "timeline.jsonl", "states.jsonl"]:
-            path = canon_dir / f
-            if path.exists():
-                path.unlink()
+            (canon_dir / f).unlink(missing_ok=True)
 
     async def rebuild_chapter_canon(self, project_id: str, chapter: str) -> dict:
         """
         重建某章节的事实表（删除旧的，准备重新提取）
         返回删除的数量
         """
-        facts_removed = await self.remove_facts_by_source(project_id, chapter)
-        timeline_removed = await self.remove_timeline_by_source(project_id, chapter)
-        states_removed = await self.remove_states_by_chapter(project_id, chapter)
+        # 三个文件互不相关，并发处理
+        facts_removed, timeline_removed, states_removed = await asyncio.gather(
+            self.remove_facts_by_source(project_id, chapter),
+            self.remove_timeline_by_source(project_id, chapter),
+            self.remove_states_by_chapter(project_id, chapter)
+        )
 
         return {
             "facts_removed": facts_removed,
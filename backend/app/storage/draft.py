@@ -2,13 +2,16 @@
 草稿存储：场景简报、草稿、审稿意见、摘要
 """
 
-import re
+import asyncio
+import bisect
+import os
 from datetime import datetime
 from pathlib import Path
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 
 from app.models.draft import SceneBrief, Draft, Review, ChapterSummary
 from app.storage.base import BaseStorage
+from app.storage._chapter_key import chapter_sort_key
 from app.utils.helpers import count_words
 
 
@@ -22,101 +25,87 @@ class DraftStorage(BaseStorage):
             config = get_config()
             data_dir = str(config.data_dir)
         super().__init__(data_dir)
+        # 草稿目录 -> (目录标识, 排好序的章节, 对应的排序键)，增删章节会改变目录修改时间
+        self._chapter_indexes: Dict[Path, Tuple[tuple, List[str], List[tuple]]] = {}
 
     def _chapter_dir(self, project_id: str, chapter: str) -> Path:
         """获取章节目录"""
-        return self._get_project_dir(project_id) / "drafts" / chapter
+        return self._get_project_dir(project_id, "drafts") / chapter
+
+    def _invalidate_chapter_index(self, project_id: str) -> None:
+        """丢弃章节索引（目录修改时间精度较粗时，同一时刻内的增删不会改变目录标识）"""
+        self._chapter_indexes.pop(self._get_project_dir(project_id, "drafts"), None)
+
+    def _ensure_dir(self, path: Path) -> None:
+        """确保目录存在；写入草稿文件时可能顺带创建了新章节目录，章节索引一并失效"""
+        super()._ensure_dir(path)
+        self._chapter_indexes.pop(path.parent, None)
 
     # ========== 章节管理 ==========
 
     async def list_chapters(self, project_id: str) -> List[str]:
         """列出所有章节"""
-        drafts_dir = self._get_project_dir(project_id) / "drafts"
-        chapters = []
-        if drafts_dir.exists():
-            for d in drafts_dir.iterdir():
-                if d.is_dir():
-                    chapters.append(d.name)
-        return self._sort_chapters(chapters)
+        chapters, _ = self._chapter_index(project_id)
+        return list(chapters)
+
+    def _chapter_index(self, project_id: str) -> Tuple[List[str], List[tuple]]:
+        """排好序的章节列表及其排序键，目录未变时复用（返回值只读）"""
+        drafts_dir = self._get_project_dir(project_id, "drafts")
+        dir_key = self._file_key(drafts_dir)
+        if dir_key is None:
+            return [], []
+        entry = self._chapter_indexes.get(drafts_dir)
+        if entry is not None and entry[0] == dir_key:
+            return entry[1], entry[2]
+        chapters = self._sort_chapters(self._scan_names(drafts_dir, dirs=True))
+        keys = [chapter_sort_key(c) for c in chapters]
+        self._chapter_indexes[drafts_dir] = (dir_key, chapters, keys)
+        return chapters, keys
 
     def _sort_chapters(self, chapters: List[str]) -> List[str]:
         """按章节号排序，支持多种格式"""
-        # 中文数字映射
-        cn_num_map = {
-            '零': 0, '〇': 0, '一': 1, '二': 2, '三': 3, '四': 4, '五': 5,
-            '六': 6, '七': 7, '八': 8, '九': 9, '十': 10,
-            '百': 100, '千': 1000, '万': 10000
-        }
-
-        def cn_to_num(cn_str: str) -> int:
-            """将中文数字转换为阿拉伯数字"""
-            if not cn_str:
-                return 0
-            result = 0
-            temp = 0
-            for char in cn_str:
-                if char in cn_num_map:
-                    val = cn_num_map[char]
-                    if val >= 10:
-                        if temp == 0:
-                            temp = 1
-                        result += temp * val
-                        temp = 0
-                    else:
-                        temp = temp * 10 + val
-            result += temp
-            return result if result > 0 else -1
-
-        def sort_key(ch: str):
-            # 1. 匹配 "第X章" 格式（中文数字）
-            match = re.match(r'第([零〇一二三四五六七八九十百千万]+)章', ch)
-            if match:
-                return (2, cn_to_num(match.group(1)), ch)
-
-            # 2. 匹配 "第X章" 格式（阿拉伯数字）
-            match = re.match(r'第(\d+)章', ch)
-            if match:
-                return (2, int(match.group(1)), ch)
-
-            # 3. 匹配 "chX" 格式
-            match = re.match(r'ch(\d+)', ch, re.IGNORECASE)
-            if match:
-                return (2, int(match.group(1)), ch)
-
-            # 4. 匹配 "Chapter X" 格式
-            match = re.match(r'chapter\s*(\d+)', ch, re.IGNORECASE)
-            if match:
-                return (2, int(match.group(1)), ch)
-
-            # 5. 匹配纯数字开头
-            match = re.match(r'(\d+)', ch)
-            if match:
-                return (2, int(match.group(1)), ch)
-
-            # 6. 特殊章节（序章、楔子等）排最前面
-            special_order = {'序章': 0, '楔子': 1, '引子': 2, '序言': 3, '前言': 4}
-            for key, order in special_order.items():
-                if key in ch:
-                    return (1, order, ch)
-
-            # 7. 其他按字母顺序
-            return (3, 0, ch)
-
-        return sorted(chapters, key=sort_key)
+        return sorted(chapters, key=chapter_sort_key)
+
+    def fingerprint(self, project_id: str) -> tuple:
+        """
+        草稿目录指纹：各章节目录下文件的 (名称, 修改时间, 大小)
+
+        只做 stat 不读内容，任何草稿/成稿/摘要的增删改都会改变指纹
+        """
+        drafts_dir = self._get_project_dir(project_id, "drafts")
+        entries = []
+        try:
+            with os.scandir(drafts_dir) as chapter_dirs:
+                for d in chapter_dirs:
+                    if not d.is_dir():
+                        continue
+                    with os.scandir(d.path) as files:
+                        for f in files:
+                            st = f.stat()
+                            entries.append((d.name, f.name, st.st_mtime_ns, st.st_size))
+                    entries.append((d.name, "", 0, 0))
+        except FileNotFoundError:
+            pass
+        return tuple(sorted(entries))
 
     async def create_chapter(self, project_id: str, chapter: str) -> None:
         """创建章节目录"""
         chapter_dir = self._chapter_dir(project_id, chapter)
         chapter_dir.mkdir(parents=True, exist_ok=True)
+        self._invalidate_chapter_index(project_id)
 
     async def delete_chapter(self, project_id: str, chapter: str) -> bool:
         """删除章节"""
         import shutil
         chapter_dir = self._chapter_dir(project_id, chapter)
-        if chapter_dir.exists():
-            shutil.rmtree(chapter_dir)
-            return True
-        return False
+        try:
+            # 章节下可能有多个版本文件，放到线程里删除，不阻塞事件循环
+            await asyncio.to_thread(shutil.rmtree, chapter_dir)
+        except FileNotFoundError:
+            return False
+        finally:
+            self._invalidate_chapter_index(project_id)
+        return True
 
     # ========== 场景简报 ==========
 
@@ -138,12 +127,20 @@ class DraftStorage(BaseStorage):
     async def list_versions(self, project_id: str, chapter: str) -> List[str]:
         """列出草稿版本"""
         chapter_dir = self._chapter_dir(project_id, chapter)
-        versions = []
-        if chapter_dir.exists():
-            for f in chapter_dir.glob("v*.md"):
-                versions.append(f.stem)
+        versions = [name for name in self._scan_names(chapter_dir, ".md") if name.startswith("v")]
         # 按版本号数字排序（v1, v2, ..., v10, v11）
-        return sorted(versions, key=lambda v: int(v[1:]) if v[1:].isdigit() else 0)
+        return sorted(versions, key=self._version_number)
+
+    @staticmethod
+    def _version_number(version: str) -> int:
+        """版本号数字（v12 -> 12），无法解析时为 0"""
+        return int(version[1:]) if version[1:].isdigit() else 0
+
+    async def _latest_version(self, project_id: str, chapter: str) -> Optional[str]:
+        """最新版本号，只取最大值不排序；没有版本时返回 None"""
+        chapter_dir = self._chapter_dir(project_id, chapter)
+        versions = (name for name in self._scan_names(chapter_dir, ".md") if name.startswith("v"))
+        return max(versions, key=self._version_number, default=None)
 
     async def get_draft(self, project_id: str, chapter: str, version: str) -> Optional[Draft]:
         """获取草稿"""
@@ -151,10 +148,10 @@ class DraftStorage(BaseStorage):
         content = await self.read_text(path)
         if content is not None:
             # 使用文件修改时间作为创建时间
-            created_at = None
-            if path.exists():
-                mtime = path.stat().st_mtime
-                created_at = datetime.fromtimestamp(mtime)
+            try:
+                created_at = datetime.fromtimestamp(path.stat().st_mtime)
+            except FileNotFoundError:
+                created_at = None
             return Draft(
                 chapter=chapter,
                 version=version,
@@ -164,6 +161,17 @@ class DraftStorage(BaseStorage):
             )
         return None
 
+    def get_version_times(self, project_id: str, chapter: str, versions: List[str]) -> List[Optional[datetime]]:
+        """各版本草稿的修改时间（与 get_draft 的 created_at 一致），只 stat 不读内容；文件不存在为 None"""
+        chapter_dir = self._chapter_dir(project_id, chapter)
+        times = []
+        for version in versions:
+            try:
+                times.append(datetime.fromtimestamp((chapter_dir / f"{version}.md").stat().st_mtime))
+            except FileNotFoundError:
+                times.append(None)
+        return times
+
     async def save_draft(self, project_id: str, draft: Draft, max_versions: int = 10) -> Draft:
         """保存草稿，并限制版本数量"""
         draft.word_count = count_words(draft.content)
@@ -183,25 +191,21 @@ class DraftStorage(BaseStorage):
             to_delete = versions[:-max_versions]
             chapter_dir = self._chapter_dir(project_id, chapter)
             for version in to_delete:
-                path = chapter_dir / f"{version}.md"
-                if path.exists():
-                    path.unlink()
+                (chapter_dir / f"{version}.md").unlink(missing_ok=True)
 
     async def get_latest_draft(self, project_id: str, chapter: str) -> Optional[Draft]:
         """获取最新版本草稿"""
-        versions = await self.list_versions(project_id, chapter)
-        if versions:
-            return await self.get_draft(project_id, chapter, versions[-1])
+        version = await self._latest_version(project_id, chapter)
+        if version:
+            return await self.get_draft(project_id, chapter, version)
         return None
 
     async def get_next_version(self, project_id: str, chapter: str) -> str:
         """获取下一个版本号"""
-        versions = await self.list_versions(project_id, chapter)
-        if not versions:
+        last = await self._latest_version(project_id, chapter)
+        if not last:
             return "v1"
-        last = versions[-1]
-        num = int(last[1:])  # v1 -> 1
-        return f"v{num + 1}"
+        return f"v{self._version_number(last) + 1}"
 
     # ========== 审稿意见 ==========
 
@@ -247,19 +251,17 @@ class DraftStorage(BaseStorage):
 
     async def get_previous_summaries(self, project_id: str, current_chapter: str, limit: int = 5) -> List[ChapterSummary]:
         """获取前文摘要（用于上下文）"""
-        chapters = await self.list_chapters(project_id)
-        summaries = []
-
-        try:
-            idx = chapters.index(current_chapter)
-        except ValueError:
+        chapters, keys = self._chapter_index(project_id)
+
+        # 在排序键上二分定位当前章节；不同章节名可能排序键相同，在相等区间内再逐个比对
+        key = chapter_sort_key(current_chapter)
+        idx = bisect.bisect_left(keys, key)
+        while idx < len(chapters) and keys[idx] == key and chapters[idx] != current_chapter:
+            idx += 1
+        if idx >= len(chapters) or chapters[idx] != current_chapter:
             idx = len(chapters)
 
-        # 取当前章节之前的摘要
-        prev_chapters = chapters[:idx]
-        for ch in prev_chapters[-limit:]:
-            summary = await self.get_summary(project_id, ch)
-            if summary:
-                summaries.append(summary)
-
-        return summaries
+        # 取当前章节之前的摘要，并发读取
+        prev_chapters = chapters[:idx][-limit:] if limit > 0 else []
+        summaries = await asyncio.gather(*(self.get_summary(project_id, ch) for ch in prev_chapters))
+        return [summary for summary in summaries if summary]
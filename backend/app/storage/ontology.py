@@ -2,8 +2,14 @@
 本体存储：管理结构化的故事本体数据
 """
 
+import asyncio
 import logging
-from typing import Optional, List
+import pickle
+import weakref
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import AsyncIterator, Dict, Optional, List, Tuple
 
 from app.models.ontology import (
     StoryOntology,
@@ -20,12 +26,28 @@ from app.models.ontology import (
     TimelineEvent,
     EventType
 )
+from app.storage._chapter_key import chapter_sort_key
 from app.storage.base import BaseStorage
 from app.utils.helpers import generate_id
 from app.config import get_config
 
 logger = logging.getLogger(__name__)
 
+# 本体对象缓存：文件路径 -> (文件标识, pickle 后的 StoryOntology)，所有存储实例共享
+# 命中时直接反序列化出独立副本，省去 YAML 解析和逐个节点重建；保存时用新内容覆盖
+ONTOLOGY_CACHE_SIZE = 16
+_ontology_cache: "OrderedDict[Path, Tuple[tuple, bytes]]" = OrderedDict()
+# 同一项目的“读取-修改-保存”串行执行，避免并发修改互相覆盖
+# 弱引用：锁只在有协程持有或等待时存在，不随项目数累积
+_ontology_locks: "weakref.WeakValueDictionary[Path, asyncio.Lock]" = weakref.WeakValueDictionary()
+# 角色状态日志的末尾快照：日志路径 -> (文件标识, 角色名 -> (章节, 状态, 位置, 目标))
+# 保存本体时只和它比较，不必每次重读整个日志
+_status_heads: Dict[Path, Tuple[tuple, Dict[str, tuple]]] = {}
+# 写作上下文缓存：(本体文件路径, 角色列表, token 预算) -> (文件标识, 上下文)
+# 与本体对象缓存同样按文件标识校验，文件一变即失效；命中时连本体都不必反序列化
+WRITING_CONTEXT_CACHE_SIZE = 32
+_writing_context_cache: "OrderedDict[tuple, Tuple[tuple, str]]" = OrderedDict()
+
 
 class OntologyStorage(BaseStorage):
     """本体存储"""
@@ -39,17 +61,49 @@ class OntologyStorage(BaseStorage):
 
     def _ontology_path(self, project_id: str):
         """本体文件路径"""
-        return self._get_project_dir(project_id) / "ontology" / "story_ontology.yaml"
+        return self._get_project_dir(project_id, "ontology") / "story_ontology.yaml"
+
+    def _journal_path(self, project_id: str) -> Path:
+        """角色状态日志路径"""
+        return self._get_project_dir(project_id, "ontology") / "status_journal.jsonl"
+
+    def _lock(self, project_id: str) -> asyncio.Lock:
+        """某项目本体的修改锁"""
+        return _ontology_locks.setdefault(self._ontology_path(project_id), asyncio.Lock())
+
+    @staticmethod
+    def _remember(path: Path, file_key: Optional[tuple], ontology: StoryOntology) -> None:
+        """记入本体对象缓存"""
+        if file_key is None:
+            return
+        _ontology_cache[path] = (file_key, pickle.dumps(ontology, pickle.HIGHEST_PROTOCOL))
+        _ontology_cache.move_to_end(path)
+        while len(_ontology_cache) > ONTOLOGY_CACHE_SIZE:
+            _ontology_cache.popitem(last=False)
 
     # ==================== 整体本体 ====================
 
     async def get_ontology(self, project_id: str) -> StoryOntology:
         """获取故事本体（不存在则创建空的）"""
         path = self._ontology_path(project_id)
+        # 先取文件标识再读内容：读取期间文件若被改写，下次标识对不上会重新读取
+        file_key = self._file_key(path)
+        entry = _ontology_cache.get(path)
+        if entry is not None and file_key is not None and entry[0] == file_key:
+            _ontology_cache.move_to_end(path)
+            return pickle.loads(entry[1])
+
         data = await self.read_yaml(path)
 
         if data:
-            return StoryOntology(**data)
+            try:
+                # 自己写出的文件，跳过逐字段校验
+                ontology = StoryOntology.from_trusted_dict(data)
+            except (TypeError, ValueError, AttributeError):
+                # 文件被手动改坏时走完整校验，给出明确错误
+                ontology = StoryOntology(**data)
+            self._remember(path, file_key, ontology)
+            return ontology
 
         # 创建空本体
         ontology = StoryOntology(project_id=project_id)
@@ -59,10 +113,77 @@ class OntologyStorage(BaseStorage):
         """保存故事本体"""
         path = self._ontology_path(project_id)
         ontology.version += 1
+        _ontology_cache.pop(path, None)
         # 使用 mode="json" 确保 Enum 类型正确序列化为字符串值
         await self.write_yaml(path, ontology.model_dump(mode="json"))
+        # 刚保存的对象就是文件内容，下次读取不必重新解析
+        self._remember(path, self._file_key(path), ontology)
+        await self._journal_statuses(project_id, ontology)
         logger.info(f"保存本体 v{ontology.version}: {project_id}")
 
+    # ==================== 角色状态日志 ====================
+
+    @staticmethod
+    def _status_snapshot(node: CharacterNode) -> tuple:
+        return (node.last_updated_chapter, node.status.value, node.current_location, node.current_goal)
+
+    async def _status_head(self, project_id: str) -> Dict[str, tuple]:
+        """日志中每个角色最后一条记录（日志被外部改动时重新读取）"""
+        path = self._journal_path(project_id)
+        file_key = self._file_key(path) or ()
+        entry = _status_heads.get(path)
+        if entry is not None and entry[0] == file_key:
+            return entry[1]
+        head = {}
+        for record in await self.read_jsonl(path):
+            head[record["name"]] = (record["chapter"], record["status"], record["location"], record["goal"])
+        _status_heads[path] = (file_key, head)
+        return head
+
+    async def _journal_statuses(self, project_id: str, ontology: StoryOntology) -> None:
+        """
+        把状态有变化的角色追加到状态日志（每条带所在章节）
+
+        重建时按日志回放到指定章节之前，而不是直接清空角色状态；
+        无论状态由哪条路径修改（提取、接口、批量事务），保存时统一记录
+        """
+        head = await self._status_head(project_id)
+        records = []
+        for name, node in ontology.characters.nodes.items():
+            snapshot = self._status_snapshot(node)
+            # 没有章节归属的状态无法按章节回放，不记录
+            if snapshot[0] and head.get(name) != snapshot:
+                head[name] = snapshot
+                records.append({
+                    "name": name,
+                    "chapter": snapshot[0],
+                    "status": snapshot[1],
+                    "location": snapshot[2],
+                    "goal": snapshot[3],
+                })
+        if records:
+            path = self._journal_path(project_id)
+            await self.append_jsonl_many(path, records)
+            _status_heads[path] = (self._file_key(path) or (), head)
+
+    @asynccontextmanager
+    async def mutate_ontology(self, project_id: str) -> AsyncIterator[StoryOntology]:
+        """
+        批量修改本体（事务）：进入时读取一次，退出时保存一次（块内出错则不保存）
+
+        多次修改放在同一个块里，只解析、序列化一次整个本体文件
+
+        持有该项目的修改锁，块内不要再调用本存储的其他修改方法
+
+        用法：
+            async with storage.mutate_ontology(project_id) as ontology:
+                ontology.characters.add_character(node)
+        """
+        async with self._lock(project_id):
+            ontology = await self.get_ontology(project_id)
+            yield ontology
+            await self.save_ontology(project_id, ontology)
+
     # ==================== 角色图操作 ====================
 
     async def add_character_node(
@@ -77,20 +198,18 @@ class OntologyStorage(BaseStorage):
         chapter: str = ""
     ) -> CharacterNode:
         """添加或更新角色节点"""
-        ontology = await self.get_ontology(project_id)
-
-        node = CharacterNode(
-            name=name,
-            status=status,
-            current_location=location,
-            current_goal=goal,
-            aliases=aliases or [],
-            groups=groups or [],
-            last_updated_chapter=chapter
-        )
-
-        ontology.characters.add_character(node)
-        await self.save_ontology(project_id, ontology)
+        async with self.mutate_ontology(project_id) as ontology:
+            node = CharacterNode(
+                name=name,
+                status=status,
+                current_location=location,
+                current_goal=goal,
+                aliases=aliases or [],
+                groups=groups or [],
+                last_updated_chapter=chapter
+            )
+
+            ontology.characters.add_character(node)
 
         return node
 
@@ -104,23 +223,29 @@ class OntologyStorage(BaseStorage):
         chapter: str = ""
     ) -> Optional[CharacterNode]:
         """更新角色状态"""
-        ontology = await self.get_ontology(project_id)
-
-        if name not in ontology.characters.nodes:
-            logger.warning(f"角色不存在: {name}")
-            return None
-
-        node = ontology.characters.nodes[name]
-        if status is not None:
-            node.status = status
-        if location is not None:
-            node.current_location = location
-        if goal is not None:
-            node.current_goal = goal
-        if chapter:
-            node.last_updated_chapter = chapter
-
-        await self.save_ontology(project_id, ontology)
+        async with self._lock(project_id):
+            ontology = await self.get_ontology(project_id)
+
+            node = ontology.characters.get_node(name)
+            if node is None:
+                logger.warning(f"角色不存在: {name}")
+                return None
+
+            updates = {
+                "status": status,
+                "current_location": location,
+                "current_goal": goal,
+                "last_updated_chapter": chapter or None,
+            }
+            changed = False
+            for field, value in updates.items():
+                if value is not None and getattr(node, field) != value:
+                    setattr(node, field, value)
+                    changed = True
+
+            # 没有实际变化时不重写整个本体文件
+            if changed:
+                await self.save_ontology(project_id, ontology)
         return node
 
     async def add_relationship(
@@ -134,19 +259,17 @@ class OntologyStorage(BaseStorage):
         chapter: str = ""
     ) -> Relationship:
         """添加角色关系"""
-        ontology = await self.get_ontology(project_id)
-
-        rel = Relationship(
-            source=source,
-            target=target,
-            relation_type=relation_type,
-            description=description,
-            bidirectional=bidirectional,
-            established_at=chapter
-        )
-
-        ontology.characters.add_relationship(rel)
-        await self.save_ontology(project_id, ontology)
+        async with self.mutate_ontology(project_id) as ontology:
+            rel = Relationship(
+                source=source,
+                target=target,
+                relation_type=relation_type,
+                description=description,
+                bidirectional=bidirectional,
+                established_at=chapter
+            )
+
+            ontology.characters.add_relationship(rel)
 
         return rel
 
@@ -168,14 +291,11 @@ class OntologyStorage(BaseStorage):
         time_period: str = None
     ) -> WorldOntology:
         """设置世界背景"""
-        ontology = await self.get_ontology(project_id)
-
-        if setting is not None:
-            ontology.world.setting = setting
-        if time_period is not None:
-            ontology.world.time_period = time_period
-
-        await self.save_ontology(project_id, ontology)
+        async with self.mutate_ontology(project_id) as ontology:
+            if setting is not None:
+                ontology.world.setting = setting
+            if time_period is not None:
+                ontology.world.time_period = time_period
         return ontology.world
 
     async def add_world_rule(
@@ -187,18 +307,16 @@ class OntologyStorage(BaseStorage):
         source: str = ""
     ) -> WorldRule:
         """添加世界规则"""
-        ontology = await self.get_ontology(project_id)
-
-        world_rule = WorldRule(
-            id=generate_id("R"),
-            rule=rule,
-            category=category,
-            immutable=immutable,
-            source=source
-        )
+        async with self.mutate_ontology(project_id) as ontology:
+            world_rule = WorldRule(
+                id=generate_id("R"),
+                rule=rule,
+                category=category,
+                immutable=immutable,
+                source=source
+            )
 
-        ontology.world.add_rule(world_rule)
-        await self.save_ontology(project_id, ontology)
+            ontology.world.add_rule(world_rule)
 
         return world_rule
 
@@ -213,19 +331,17 @@ class OntologyStorage(BaseStorage):
         enemies: List[str] = None
     ) -> Faction:
         """添加势力/组织"""
-        ontology = await self.get_ontology(project_id)
-
-        faction = Faction(
-            name=name,
-            description=description,
-            leader=leader,
-            members=members or [],
-            allies=allies or [],
-            enemies=enemies or []
-        )
-
-        ontology.world.factions[name] = faction
-        await self.save_ontology(project_id, ontology)
+        async with self.mutate_ontology(project_id) as ontology:
+            faction = Faction(
+                name=name,
+                description=description,
+                leader=leader,
+                members=members or [],
+                allies=allies or [],
+                enemies=enemies or []
+            )
+
+            ontology.world.factions[name] = faction
 
         return faction
 
@@ -237,16 +353,14 @@ class OntologyStorage(BaseStorage):
         parent: str = ""
     ) -> Location:
         """添加地点"""
-        ontology = await self.get_ontology(project_id)
-
-        location = Location(
-            name=name,
-            description=description,
-            parent=parent
-        )
+        async with self.mutate_ontology(project_id) as ontology:
+            location = Location(
+                name=name,
+                description=description,
+                parent=parent
+            )
 
-        ontology.world.locations[name] = location
-        await self.save_ontology(project_id, ontology)
+            ontology.world.locations[name] = location
 
         return location
 
@@ -265,8 +379,6 @@ class OntologyStorage(BaseStorage):
         consequences: List[str] = None
     ) -> TimelineEvent:
         """添加时间线事件"""
-        ontology = await self.get_ontology(project_id)
-
         timeline_event = TimelineEvent(
             id=generate_id("E"),
             time=time,
@@ -278,21 +390,35 @@ class OntologyStorage(BaseStorage):
             importance=importance,
             consequences=consequences or []
         )
+        await self.add_timeline_events(project_id, [timeline_event])
+        return timeline_event
 
+    async def add_timeline_events(
+        self,
+        project_id: str,
+        events: List[TimelineEvent]
+    ) -> List[TimelineEvent]:
+        """批量添加时间线事件：整批只读写一次本体，当前时间取最后一个有时间的事件"""
+        async with self.mutate_ontology(project_id) as ontology:
+            for timeline_event in events:
+                if not timeline_event.id:
+                    timeline_event.id = generate_id("E")
+                self._add_event(ontology, timeline_event)
+        return events
+
+    @staticmethod
+    def _add_event(ontology: StoryOntology, timeline_event: TimelineEvent) -> None:
+        """把事件加入本体时间线并推进当前时间"""
         ontology.timeline.add_event(timeline_event)
 
         # 更新当前时间
-        if time:
-            ontology.timeline.current_time = time
-
-        await self.save_ontology(project_id, ontology)
-        return timeline_event
+        if timeline_event.time:
+            ontology.timeline.current_time = timeline_event.time
 
     async def set_current_time(self, project_id: str, time: str) -> None:
         """设置当前故事时间"""
-        ontology = await self.get_ontology(project_id)
-        ontology.timeline.current_time = time
-        await self.save_ontology(project_id, ontology)
+        async with self.mutate_ontology(project_id) as ontology:
+            ontology.timeline.current_time = time
 
     # ==================== 上下文获取 ====================
 
@@ -302,9 +428,24 @@ class OntologyStorage(BaseStorage):
         characters: List[str] = None,
         token_budget: int = 3000
     ) -> str:
-        """获取写作用的紧凑上下文"""
+        """获取写作用的紧凑上下文（本体文件未变时复用上次的结果）"""
+        path = self._ontology_path(project_id)
+        # 先取文件标识再读本体，读取期间文件被改写时结果记在旧标识下，不会被误用
+        file_key = self._file_key(path)
+        key = (path, tuple(characters or ()), token_budget)
+        entry = _writing_context_cache.get(key)
+        if entry is not None and file_key is not None and entry[0] == file_key:
+            _writing_context_cache.move_to_end(key)
+            return entry[1]
+
         ontology = await self.get_ontology(project_id)
-        return ontology.get_context_for_writing(characters, token_budget)
+        context = ontology.get_context_for_writing(characters, token_budget)
+        if file_key is not None:
+            _writing_context_cache[key] = (file_key, context)
+            _writing_context_cache.move_to_end(key)
+            while len(_writing_context_cache) > WRITING_CONTEXT_CACHE_SIZE:
+                _writing_context_cache.popitem(last=False)
+        return context
 
     async def get_review_context(
         self,
@@ -327,34 +468,51 @@ class OntologyStorage(BaseStorage):
         从某章节开始重建本体（删除该章节及之后的数据）
         返回删除的数量
         """
-        ontology = await self.get_ontology(project_id)
-
-        # 删除该章节及之后的时间线事件
-        events_before = len(ontology.timeline.events)
-        ontology.timeline.events = [
-            e for e in ontology.timeline.events
-            if e.source_chapter and e.source_chapter < chapter
-        ]
-        events_removed = events_before - len(ontology.timeline.events)
-
-        # 删除该章节建立的关系
-        rels_before = len(ontology.characters.relationships)
-        ontology.characters.relationships = [
-            r for r in ontology.characters.relationships
-            if r.established_at and r.established_at < chapter
-        ]
-        rels_removed = rels_before - len(ontology.characters.relationships)
-
-        # 重置角色状态到该章节之前
-        # （这里简化处理，实际可能需要更复杂的逻辑）
-        for node in ontology.characters.nodes.values():
-            if node.last_updated_chapter and node.last_updated_chapter >= chapter:
-                node.last_updated_chapter = ""
-                node.current_location = ""
-                node.current_goal = ""
-
-        ontology.last_updated_chapter = ""
-        await self.save_ontology(project_id, ontology)
+        # 按章节号比较（字符串比较会把 ch10 排在 ch9 之前），排序键带缓存
+        cut = chapter_sort_key(chapter)
+
+        def before_cut(c: str) -> bool:
+            return bool(c) and chapter_sort_key(c) < cut
+
+        async with self.mutate_ontology(project_id) as ontology:
+            # 删除该章节及之后的时间线事件
+            events_before = len(ontology.timeline.events)
+            ontology.timeline.events = [
+                e for e in ontology.timeline.events
+                if before_cut(e.source_chapter)
+            ]
+            events_removed = events_before - len(ontology.timeline.events)
+
+            # 删除该章节建立的关系
+            rels_before = len(ontology.characters.relationships)
+            ontology.characters.relationships = [
+                r for r in ontology.characters.relationships
+                if before_cut(r.established_at)
+            ]
+            rels_removed = rels_before - len(ontology.characters.relationships)
+
+            # 重置角色状态到该章节之前：截断状态日志，按保留的记录回放
+            journal_path = self._journal_path(project_id)
+            kept = [r for r in await self.read_jsonl(journal_path) if before_cut(r["chapter"])]
+            await self.write_jsonl(journal_path, kept)
+            head = {}
+            for record in kept:
+                head[record["name"]] = (record["chapter"], record["status"], record["location"], record["goal"])
+            _status_heads[journal_path] = (self._file_key(journal_path) or (), head)
+
+            for name, node in ontology.characters.nodes.items():
+                if node.last_updated_chapter and not before_cut(node.last_updated_chapter):
+                    snapshot = head.get(name)
+                    if snapshot is not None:
+                        node.last_updated_chapter, status, node.current_location, node.current_goal = snapshot
+                        node.status = CharacterStatus(status)
+                    else:
+                        # 日志中没有该章节之前的记录
+                        node.last_updated_chapter = ""
+                        node.current_location = ""
+                        node.current_goal = ""
+
+            ontology.last_updated_chapter = ""
 
         return {
             "events_removed": events_removed,
@@ -364,6 +522,9 @@ class OntologyStorage(BaseStorage):
     async def clear_ontology(self, project_id: str) -> None:
         """清空本体（谨慎使用）"""
         path = self._ontology_path(project_id)
-        if path.exists():
-            path.unlink()
+        _ontology_cache.pop(path, None)
+        path.unlink(missing_ok=True)
+        journal_path = self._journal_path(project_id)
+        _status_heads.pop(journal_path, None)
+        await self.delete(journal_path)
         logger.warning(f"已清空本体: {project_id}")
@@ -2,6 +2,7 @@
 项目存储
 """
 
+import asyncio
 import shutil
 from pathlib import Path
 from typing import List, Optional
@@ -16,15 +17,10 @@ class ProjectStorage(BaseStorage):
 
     async def list_projects(self) -> List[Project]:
         """列出所有项目"""
-        projects = []
-        if not self.data_dir.exists():
-            return projects
-
-        for d in self.data_dir.iterdir():
-            if d.is_dir():
-                project = await self.get_project(d.name)
-                if project:
-                    projects.append(project)
+        # 各项目的 project.yaml 并发读取
+        names = self._scan_names(self.data_dir, dirs=True)
+        projects = await asyncio.gather(*(self.get_project(name) for name in names))
+        projects = [project for project in projects if project]
 
         return sorted(projects, key=lambda p: p.updated_at, reverse=True)
 
@@ -91,10 +87,12 @@ class ProjectStorage(BaseStorage):
     async def delete_project(self, project_id: str) -> bool:
         """删除项目"""
         project_dir = self._get_project_dir(project_id)
-        if project_dir.exists():
-            shutil.rmtree(project_dir)
-            return True
-        return False
+        try:
+            # 整个项目目录文件很多，放到线程里删除，不阻塞事件循环
+            await asyncio.to_thread(shutil.rmtree, project_dir)
+        except FileNotFoundError:
+            return False
+        return True
 
     async def _create_default_cards(self, project_id: str) -> None:
         """创建默认的文风卡和规则卡"""
@@ -2,11 +2,30 @@
 通用工具函数 (Helper Functions)
 """
 
+import itertools
+import os
 import re
+import time
 import uuid
-from datetime import datetime
+from functools import lru_cache
 from typing import Optional
 
+# 常用正则预编译（count_words 等在每次保存/读取草稿时都会调用）
+_UNSAFE_FILENAME_RE = re.compile(r'[<>:"/\\|?*]')
+# 按连续的汉字段匹配，比逐字匹配少产生大量单字对象
+_CHINESE_RUN_RE = re.compile(r'[\u4e00-\u9fff]+')
+
+# 自动检测语言时每段采样的字符数：长文本只看首、中、尾三段，不扫描全文
+_LANGUAGE_SAMPLE_CHARS = 2048
+_CHAPTER_ID_RE = re.compile(r'ch(\d+)(?:-(\d+))?')
+_SENTENCE_END_RE = re.compile(r'[。！？.!?]+')
+
+# generate_id 的 4 位后缀：进程内递增计数器（起点随机，不同进程不易撞号），
+# 同一秒内 65536 个 ID 以内不会重复；时间戳按秒缓存，同一秒内不重复格式化
+_ID_COUNTER = itertools.count(int.from_bytes(os.urandom(2), "big"))
+_id_second = -1
+_id_timestamp = ""
+
 
 def generate_id(prefix: str = "") -> str:
     """
@@ -18,11 +37,14 @@ def generate_id(prefix: str = "") -> str:
     Returns:
         格式化的 ID，如 "F0001" 或 UUID
     """
+    global _id_second, _id_timestamp
     if prefix:
         # 简单递增 ID（实际使用时需要配合存储层）
-        timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-        short_uuid = uuid.uuid4().hex[:4].upper()
-        return f"{prefix}{timestamp}{short_uuid}"
+        second = int(time.time())
+        if second != _id_second:
+            _id_timestamp = time.strftime("%Y%m%d%H%M%S", time.localtime(second))
+            _id_second = second
+        return f"{prefix}{_id_timestamp}{next(_ID_COUNTER) & 0xFFFF:04X}"
     else:
         return uuid.uuid4().hex
 
@@ -37,8 +59,13 @@ def sanitize_filename(name: str) -> str:
     Returns:
         安全的文件名
     """
+    # 常见的名字本身就是安全的，直接返回，不再复制字符串
+    if (name and len(name) <= 200 and not _UNSAFE_FILENAME_RE.search(name)
+            and name[0] not in '. ' and name[-1] not in '. '):
+        return name
+
     # 移除或替换不安全字符
-    sanitized = re.sub(r'[<>:"/\\|?*]', '_', name)
+    sanitized = _UNSAFE_FILENAME_RE.sub('_', name)
     # 移除开头和结尾的空格和点
     sanitized = sanitized.strip('. ')
     # 限制长度
@@ -47,6 +74,11 @@ def sanitize_filename(name: str) -> str:
     return sanitized or "unnamed"
 
 
+def count_chinese_chars(text: str) -> int:
+    """统计文本中的汉字（CJK 基本区）个数"""
+    return sum(map(len, _CHINESE_RUN_RE.findall(text)))
+
+
 def count_words(text: str, language: str = "auto") -> int:
     """
     统计文本字数
@@ -63,21 +95,30 @@ def count_words(text: str, language: str = "auto") -> int:
 
     # 自动检测：如果中文字符超过 30%，按中文计数
     if language == "auto":
-        chinese_chars = len(re.findall(r'[\u4e00-\u9fff]', text))
-        total_chars = len(text.replace(' ', ''))
+        sample = text
+        if len(text) > 3 * _LANGUAGE_SAMPLE_CHARS:
+            mid = len(text) // 2
+            sample = "".join((
+                text[:_LANGUAGE_SAMPLE_CHARS],
+                text[mid:mid + _LANGUAGE_SAMPLE_CHARS],
+                text[-_LANGUAGE_SAMPLE_CHARS:],
+            ))
+        chinese_chars = count_chinese_chars(sample)
+        total_chars = len(sample) - sample.count(' ')
         if total_chars > 0 and chinese_chars / total_chars > 0.3:
             language = "zh"
         else:
             language = "en"
 
     if language == "zh":
-        # 中文：直接计算字符数（排除空白）
-        return len(re.sub(r'\s', '', text))
+        # 中文：直接计算字符数（排除空白），split 按空白切开后累加长度，不复制整段文本
+        return sum(map(len, text.split()))
     else:
         # 英文：按空格分词
         return len(text.split())
 
 
+@lru_cache(maxsize=1024)
 def parse_chapter_id(chapter: str) -> tuple[int, Optional[int]]:
     """
     解析章节 ID
@@ -88,8 +129,16 @@ def parse_chapter_id(chapter: str) -> tuple[int, Optional[int]]:
     Returns:
         (主章节号, 子章节号) 或 (0, None) 表示特殊章节
     """
+    # 最常见的定长格式 ch01 / ch01-02 不走正则
+    if chapter[:2] == "ch":
+        if len(chapter) == 4 and chapter[2:].isdecimal():
+            return (int(chapter[2:]), None)
+        if (len(chapter) == 7 and chapter[4] == "-"
+                and chapter[2:4].isdecimal() and chapter[5:].isdecimal()):
+            return (int(chapter[2:4]), int(chapter[5:]))
+
     # 匹配 ch01, ch01-02 格式
-    match = re.match(r'ch(\d+)(?:-(\d+))?', chapter.lower())
+    match = _CHAPTER_ID_RE.match(chapter.lower())
     if match:
         main = int(match.group(1))
         sub = int(match.group(2)) if match.group(2) else None
@@ -154,44 +203,55 @@ def split_content_by_paragraphs(content: str, chunk_size: int = 3000, overlap: i
     chunks = []
     paragraphs = content.split('\n\n')  # 按双换行分段
 
-    current_chunk = ""
+    # 当前块以片段列表累积、单独记长度，到切块时才拼接一次，避免反复复制整段字符串
+    current_parts: list[str] = []
+    current_len = 0
     for para in paragraphs:
         # 如果当前段落本身就超长，需要按句子分割
         if len(para) > chunk_size:
             # 先保存之前的内容
-            if current_chunk:
-                chunks.append(current_chunk.strip())
-                current_chunk = ""
-
-            # 按句子分割超长段落
-            sentences = re.split(r'([。！？.!?]+)', para)
-            temp = ""
-            for i in range(0, len(sentences), 2):
-                sentence = sentences[i]
-                punct = sentences[i + 1] if i + 1 < len(sentences) else ""
-                full_sentence = sentence + punct
-
-                if len(temp) + len(full_sentence) > chunk_size:
-                    if temp:
-                        chunks.append(temp.strip())
-                    temp = full_sentence
+            if current_len:
+                chunks.append(''.join(current_parts).strip())
+                current_parts, current_len = [], 0
+
+            # 按句子分割超长段落：每句连同句末标点直接从段落切出，末尾可能剩一段无标点的残句
+            ends = [m.end() for m in _SENTENCE_END_RE.finditer(para)]
+            ends.append(len(para))
+            temp_parts: list[str] = []
+            temp_len = 0
+            prev = 0
+            for end in ends:
+                full_sentence = para[prev:end]
+                prev = end
+
+                if temp_len + len(full_sentence) > chunk_size:
+                    if temp_len:
+                        chunks.append(''.join(temp_parts).strip())
+                    temp_parts, temp_len = [full_sentence], len(full_sentence)
                 else:
-                    temp += full_sentence
+                    temp_parts.append(full_sentence)
+                    temp_len += len(full_sentence)
 
-            if temp:
-                current_chunk = temp
+            if temp_len:
+                current_parts, current_len = temp_parts, temp_len
         else:
             # 正常段落处理
-            if len(current_chunk) + len(para) + 2 > chunk_size:
+            if current_len + len(para) + 2 > chunk_size:
+                current_chunk = ''.join(current_parts)
                 chunks.append(current_chunk.strip())
                 # 保留一部分重叠内容
-                if overlap > 0 and len(current_chunk) > overlap:
-                    current_chunk = current_chunk[-overlap:] + "\n\n" + para
+                if overlap > 0 and current_len > overlap:
+                    current_parts = [current_chunk[-overlap:], "\n\n", para]
+                    current_len = overlap + 2 + len(para)
                 else:
-                    current_chunk = para
+                    current_parts, current_len = [para], len(para)
+            elif current_len:
+                current_parts += ("\n\n", para)
+                current_len += 2 + len(para)
             else:
-                current_chunk = current_chunk + "\n\n" + para if current_chunk else para
+                current_parts, current_len = [para], len(para)
 
+    current_chunk = ''.join(current_parts)
     if current_chunk.strip():
         chunks.append(current_chunk.strip())
 
@@ -227,6 +287,8 @@ def smart_truncate_content(content: str, budget: int = 4000) -> str:
     return f"{head}\n\n[...中间部分省略，以下为中段采样...]\n\n{middle}\n\n[...省略部分结束，以下为结尾...]\n\n{tail}"
 
 
+# 事实陈述在每次组装上下文时都会重新估算，内容不变结果就不变
+@lru_cache(maxsize=4096)
 def estimate_tokens(text: str) -> int:
     """
     粗略估算文本的 token 数量
@@ -238,19 +300,21 @@ def estimate_tokens(text: str) -> int:
         估算的 token 数量
     """
     # 中文大约 1.5 字符 = 1 token，英文大约 4 字符 = 1 token
-    chinese_chars = len(re.findall(r'[\u4e00-\u9fff]', text))
+    chinese_chars = count_chinese_chars(text)
     other_chars = len(text) - chinese_chars
 
     return int(chinese_chars / 1.5 + other_chars / 4)
 
 
-def get_facts_by_token_budget(facts: list, token_budget: int = 2000) -> list:
+def get_facts_by_token_budget(facts: list, token_budget: int = 2000, fill: bool = True) -> list:
     """
     在 token 预算内尽可能多取事实
 
     Args:
         facts: 事实列表（已按优先级排序）
         token_budget: token 预算
+        fill: 遇到放不下的事实时跳过它继续往后找放得下的（保持优先级顺序）；
+            为 False 时在第一条放不下的事实处停止
 
     Returns:
         筛选后的事实列表
@@ -261,8 +325,12 @@ def get_facts_by_token_budget(facts: list, token_budget: int = 2000) -> list:
     for fact in facts:
         fact_tokens = estimate_tokens(fact.statement)
         if used_tokens + fact_tokens > token_budget:
-            break
+            if not fill:
+                break
+            continue
         selected.append(fact)
         used_tokens += fact_tokens
+        if used_tokens >= token_budget:
+            break
 
     return selected